@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for hexaviz. These are not part of the installed package.
+
+Each module can be run directly from the root of the repository, e.g.
+
+        python -m benchmarks.ports
+"""
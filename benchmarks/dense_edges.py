@@ -0,0 +1,54 @@
+"""
+Measures the saving of hashing and escaping each distinct name once per render, on meshes with many edges between
+few components, where the same component and port names are referenced over and over.
+
+Each mesh is rendered through jinja2 with a custom template (DOT_TEMPLATE with a trailing comment) and MD5 node IDs:
+
+    per call   DOT_FILTERS without a symbol table, computing an ID or escaped label on every call
+    memoized   render_mesh_as_dot(), which passes the filters a per-render symbol table
+    native     the native DOT_TEMPLATE emitter, for reference
+
+        python -m benchmarks.dense_edges
+"""
+import random
+import timeit
+
+from hexaviz import DOT_FILTERS, DOT_TEMPLATE, NODE_IDS_MD5, Mesh, render, render_mesh_as_dot
+
+# (servers, clients, ports per server)
+SHAPES = ((10, 100, 20), (20, 200, 50), (20, 500, 100))
+
+TEMPLATE = DOT_TEMPLATE + '{# custom #}'
+
+
+def build_dense_mesh(servers, clients, ports, seed=0):
+    """Builds a mesh where every client needs every port name, each provided by a randomly picked server.
+    """
+    rng = random.Random(seed)
+    names = ['port <{0}>'.format(i) for i in range(ports)]
+    m = Mesh()
+    for s in range(servers):
+        m.add_component('server {0}'.format(s), provides_ports=names)
+    for c in range(clients):
+        client = 'client {0}'.format(c)
+        m.add_component(client, needs_ports=names)
+        m.add_connections((client, port, 'server {0}'.format(rng.randrange(servers)), port) for port in names)
+    return m
+
+
+def main(shapes=SHAPES, repeat=3):
+    print('{0:>8} {1:>8} {2:>8} {3:>14} {4:>14} {5:>14}'.format(
+        'servers', 'clients', 'edges', 'per call (ms)', 'memoized (ms)', 'native (ms)'))
+    for servers, clients, ports in shapes:
+        m = build_dense_mesh(servers, clients, ports)
+        timings = [min(timeit.repeat(function, number=1, repeat=repeat)) for function in (
+            lambda: render(m, TEMPLATE, DOT_FILTERS),
+            lambda: render_mesh_as_dot(m, TEMPLATE, node_ids=NODE_IDS_MD5),
+            lambda: render_mesh_as_dot(m, node_ids=NODE_IDS_MD5),
+        )]
+        print('{0:>8} {1:>8} {2:>8} {3:>14.2f} {4:>14.2f} {5:>14.2f}'.format(
+            servers, clients, len(m.connections), *(t * 1e3 for t in timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Seeded generator of synthetic meshes, for benchmarks.
+
+The same arguments always generate the same mesh, so timings are comparable between runs and versions.
+"""
+import bisect
+import random
+
+from hexaviz import Mesh
+
+
+def _weights(count, skew):
+    """Returns the cumulative weights of picking each of count items, where item i has weight 1 / (i + 1) ** skew.
+
+    A skew of 0 picks uniformly, and larger skews concentrate picks on the first items (a power law).
+    """
+    total = 0.0
+    cumulative = []
+    for i in range(count):
+        total += 1.0 / (i + 1) ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def _pick(rng, cumulative):
+    return bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+
+
+def generate_records(components=1000, ports=4, domains=0, resources=0, resource_share=0.1, skew=1.0, seed=0):
+    """Generates the records describing a synthetic mesh.
+
+    Each component has ports // 2 needs ports (its fan-out) and the rest as provides ports. Every needs port is
+    connected, either to a resource or to a provides port of another component. Producers are picked with a power law,
+    so a few components have a very high fan-in. Components are spread evenly over the domains, each of which exposes a
+    needs port and a provides port of its first child.
+
+    :param int components: number of components
+    :param int ports: number of ports per component, at least 2
+    :param int domains: number of domains
+    :param int resources: number of resources
+    :param float resource_share: share of the needs ports connected to resources, if there are any
+    :param float skew: exponent of the power law used to pick producers (fan-in) and resources, 0 for uniform
+    :param int seed: seed of the random number generator
+    :returns: dict of the records, see build()
+    """
+    rng = random.Random(seed)
+    needs_count = max(1, ports // 2)
+    provides_count = max(1, ports - needs_count)
+    needs = ['n{0}'.format(i) for i in range(needs_count)]
+    provides = ['p{0}'.format(i) for i in range(provides_count)]
+    names = ['component {0}'.format(i) for i in range(components)]
+    resource_names = ['resource {0}'.format(i) for i in range(resources)]
+
+    domain_records = []
+    exposed_needs = {}  # (component, port) exposed by a domain -> domain name
+    for d in range(min(domains, components)):
+        children = names[d::domains]
+        domain_name = 'domain {0}'.format(d)
+        exposed_needs[children[0], needs[0]] = domain_name
+        domain_records.append((domain_name, children, [(children[0], needs[0])], [(children[0], provides[0])]))
+
+    # shuffle which components are popular, so that popularity is independent of position and domain
+    popularity = list(range(components))
+    rng.shuffle(popularity)
+    producer_weights = _weights(components, skew)
+    resource_weights = _weights(resources, skew) if resources else None
+
+    connections = []
+    resource_connections = []
+    for index, name in enumerate(names):
+        for port in needs:
+            consumer = exposed_needs.get((name, port), name)
+            if resource_weights and rng.random() < resource_share:
+                resource_connections.append((consumer, port, resource_names[_pick(rng, resource_weights)]))
+                continue
+            producer = popularity[_pick(rng, producer_weights)]
+            if producer == index:
+                producer = (producer + 1) % components
+            if producer != index:
+                connections.append((consumer, port, names[producer], provides[rng.randrange(provides_count)]))
+
+    return {
+        'components': [{'name': name, 'needs_ports': needs, 'provides_ports': provides} for name in names],
+        'resources': resource_names,
+        'domains': domain_records,
+        'connections': connections,
+        'resource_connections': resource_connections,
+    }
+
+
+def _add_domains(mesh, domains):
+    for domain_name, children, exposed_needs, exposed_provides in domains:
+        mesh.add_domain(domain_name)
+        for child in children:
+            mesh.add_component_to_domain(child, domain_name)
+        for child, port in exposed_needs:
+            mesh.expose_component_needs_port(child, port)
+        for child, port in exposed_provides:
+            mesh.expose_component_provides_port(child, port)
+
+
+def build(records, bulk=False):
+    """Builds the mesh described by the given records.
+
+    :param dict records: records generated by generate_records()
+    :param bool bulk: use the bulk entry points instead of adding elements one at a time
+    :returns: the new Mesh
+    """
+    if bulk:
+        m = Mesh.from_records(components=records['components'], resources=records['resources'])
+        _add_domains(m, records['domains'])
+        m.add_connections(records['connections'])
+        m.add_connections_to_resources(records['resource_connections'])
+        return m
+
+    m = Mesh()
+    for component in records['components']:
+        m.add_component(component['name'], component['needs_ports'], component['provides_ports'])
+    for resource in records['resources']:
+        m.add_resource(resource)
+    _add_domains(m, records['domains'])
+    for connection in records['connections']:
+        m.add_connection(*connection)
+    for connection in records['resource_connections']:
+        m.add_connection_to_resource(*connection)
+    return m
+
+
+def element_count(records):
+    """Returns the number of components, domains, resources and connections described by the given records."""
+    return sum(len(records[kind]) for kind in ('components', 'resources', 'domains', 'connections',
+                                                'resource_connections'))
@@ -0,0 +1,62 @@
+"""
+Measures the memory used by a mesh, reported as bytes per component and bytes per connection.
+
+Requires Python 3 (tracemalloc).
+
+        python -m benchmarks.memory
+"""
+import gc
+import tracemalloc
+
+from hexaviz import Mesh
+
+COMPONENT_COUNT = 100000
+
+
+def _traced_size(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+
+def measure(component_count=COMPONENT_COUNT, columnar=False):
+    """Returns (bytes per component, bytes per connection) for a chain of components, each with two needs and two
+    provides ports, where every needs port is connected to the previous component in the chain.
+
+    :param bool columnar: use the columnar connection store
+    """
+    names = ['component {0}'.format(i) for i in range(component_count)]
+
+    def build_components():
+        m = Mesh(columnar=columnar)
+        for name in names:
+            m.add_component(name, needs_ports=['n1', 'n2'], provides_ports=['p1', 'p2'])
+        return m
+
+    def build_connections():
+        for previous, name in zip(names, names[1:]):
+            m.add_connection(name, 'n1', previous, 'p1')
+            m.add_connection(name, 'n2', previous, 'p2')
+
+    m, component_bytes = _traced_size(build_components)
+    _, connection_bytes = _traced_size(build_connections)
+    return component_bytes / float(component_count), connection_bytes / (2.0 * (component_count - 1))
+
+
+def main():
+    for columnar in (False, True):
+        per_component, per_connection = measure(columnar=columnar)
+        print('{0} connection store'.format('columnar' if columnar else 'default'))
+        print('    bytes per component:  {0:.0f}'.format(per_component))
+        print('    bytes per connection: {0:.0f}'.format(per_connection))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Measures the time taken to build a component with a growing number of ports and to connect every one of them.
+
+Build time should grow linearly with the number of ports, i.e. the time per port should stay roughly constant.
+
+        python -m benchmarks.ports
+"""
+import timeit
+
+from hexaviz import Mesh
+
+PORT_COUNTS = (500, 1000, 2000, 4000, 8000, 16000)
+
+
+def build_gateway(port_count):
+    """Builds a mesh where a single gateway component provides port_count ports, each of which is consumed by a
+    client component that needs port_count ports.
+    """
+    ports = ['port {0}'.format(i) for i in range(port_count)]
+    m = Mesh()
+    m.add_component('gateway', provides_ports=ports)
+    m.add_component('client', needs_ports=ports)
+    for port in ports:
+        m.add_connection('client', port, 'gateway', port)
+    return m
+
+
+def main(port_counts=PORT_COUNTS, repeat=3):
+    print('{0:>8} {1:>12} {2:>12}'.format('ports', 'build (ms)', 'per port (us)'))
+    for port_count in port_counts:
+        elapsed = min(timeit.repeat(lambda: build_gateway(port_count), number=1, repeat=repeat))
+        print('{0:>8} {1:>12.2f} {2:>12.2f}'.format(port_count, elapsed * 1e3, elapsed * 1e6 / port_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Times the main phases of hexaviz on synthetic meshes of growing size, see benchmarks.generator.
+
+Each phase is timed on a freshly built mesh so that nothing is served from the caches kept on the mesh:
+
+    build          adding the elements one at a time
+    build_bulk     adding the elements with the bulk entry points
+    view           building the view model rendered by templates (Mesh.as_dict())
+    render_dot     rendering DOT_TEMPLATE with the native emitter
+    render_jinja   rendering DOT_TEMPLATE through jinja2
+    hash_md5       rendering with node IDs hashed from the names (NODE_IDS_MD5)
+    fingerprint    computing the fingerprint of the mesh
+
+Results can be saved as JSON, and compared against previously saved results to catch regressions:
+
+        python -m benchmarks.suite --sizes 100 1000 10000 --output baseline.json
+        python -m benchmarks.suite --sizes 100 1000 10000 --baseline baseline.json --tolerance 0.25
+
+The comparison exits with status 1 if any phase is slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from hexaviz import __version__, DOT_FILTERS, DOT_TEMPLATE, NODE_IDS_MD5, render, render_mesh_as_dot
+from benchmarks.generator import build, element_count, generate_records
+
+SIZES = (100, 1000, 10000, 100000, 1000000)
+
+# time.perf_counter() is not available on Python 2
+_timer = getattr(time, 'perf_counter', time.time)
+
+PHASES = ('build', 'build_bulk', 'view', 'render_dot', 'render_jinja', 'hash_md5', 'fingerprint')
+
+
+def _phase_functions(records):
+    """Returns a dict of phase name -> (setup, function), where function is timed on the result of setup."""
+    fresh_mesh = lambda: build(records, bulk=True)  # noqa: E731
+    return {
+        'build': (lambda: records, lambda r: build(r)),
+        'build_bulk': (lambda: records, lambda r: build(r, bulk=True)),
+        'view': (fresh_mesh, lambda m: m.as_dict()),
+        'render_dot': (fresh_mesh, render_mesh_as_dot),
+        'render_jinja': (fresh_mesh, lambda m: render(m, DOT_TEMPLATE, DOT_FILTERS, {'node_ids': m.node_ids})),
+        'hash_md5': (fresh_mesh, lambda m: render_mesh_as_dot(m, node_ids=NODE_IDS_MD5)),
+        'fingerprint': (fresh_mesh, lambda m: m.fingerprint()),
+    }
+
+
+def _best_time(setup, function, repeat):
+    best = None
+    for _ in range(repeat):
+        argument = setup()
+        start = _timer()
+        function(argument)
+        elapsed = _timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes=SIZES, phases=PHASES, repeat=3, seed=0, **generator_options):
+    """Times the given phases on a synthetic mesh of each of the given sizes.
+
+    :param sizes: numbers of components of the generated meshes
+    :param phases: names of the phases to time, see PHASES
+    :param int repeat: number of times each phase is timed, of which the best time is kept
+    :param int seed: seed of the mesh generator
+    :param generator_options: other arguments of benchmarks.generator.generate_records()
+    :returns: dict of the results, which can be serialised as JSON
+    """
+    results = []
+    for size in sizes:
+        records = generate_records(components=size, seed=seed, **generator_options)
+        functions = _phase_functions(records)
+        for phase in phases:
+            setup, function = functions[phase]
+            results.append({
+                'size': size,
+                'elements': element_count(records),
+                'phase': phase,
+                'seconds': _best_time(setup, function, repeat),
+            })
+    return {
+        'hexaviz': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'generator_options': generator_options,
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Compares results against a baseline, matching them by size and phase.
+
+    :param dict results: results returned by run()
+    :param dict baseline: results returned by an earlier run()
+    :param float tolerance: fraction by which a phase may be slower than the baseline before it is a regression
+    :returns: list of (result, baseline seconds or None, regressed) for each result
+    """
+    baseline_seconds = dict(((r['size'], r['phase']), r['seconds']) for r in baseline['results'])
+    comparisons = []
+    for result in results['results']:
+        before = baseline_seconds.get((result['size'], result['phase']))
+        regressed = before is not None and result['seconds'] > before * (1 + tolerance)
+        comparisons.append((result, before, regressed))
+    return comparisons
+
+
+def _print_table(comparisons):
+    print('{0:>8} {1:>9} {2:<13} {3:>12} {4:>12} {5:>8}'.format(
+        'size', 'elements', 'phase', 'time (ms)', 'base (ms)', 'change'))
+    for result, before, regressed in comparisons:
+        if before is None:
+            base, change = '-', '-'
+        else:
+            base = '{0:.2f}'.format(before * 1e3)
+            change = '{0:+.0%}'.format(result['seconds'] / before - 1) if before else '-'
+        print('{0:>8} {1:>9} {2:<13} {3:>12.2f} {4:>12} {5:>8}{6}'.format(
+            result['size'], result['elements'], result['phase'], result['seconds'] * 1e3, base, change,
+            '  REGRESSION' if regressed else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times hexaviz on synthetic meshes of growing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES[:4],
+                        help='numbers of components to benchmark (default: %(default)s)')
+    parser.add_argument('--phases', nargs='+', choices=PHASES, default=PHASES, help='phases to time (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='times each phase is run, keeping the best')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the mesh generator')
+    parser.add_argument('--ports', type=int, default=4, help='ports per component, half of which are needs ports')
+    parser.add_argument('--domains', type=int, default=0, help='number of domains')
+    parser.add_argument('--resources', type=int, default=0, help='number of resources')
+    parser.add_argument('--skew', type=float, default=1.0, help='power law exponent of the fan-in, 0 for uniform')
+    parser.add_argument('--output', help='file to save the results to, as JSON')
+    parser.add_argument('--baseline', help='JSON file of earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction by which a phase may be slower than the baseline (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.phases, args.repeat, args.seed, ports=args.ports, domains=args.domains,
+                  resources=args.resources, skew=args.skew)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = {'results': []}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    comparisons = compare(results, baseline, args.tolerance)
+    _print_table(comparisons)
+    return 1 if any(regressed for _, _, regressed in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -64,15 +64,63 @@ When visualised using Graphviz, this should produce an output that looks like:
 __author__ = "Shawn Chin"
 __version__ = "v1.2.1"
 
+import functools
+import gc
+import os
 import re
+import sys
 import hashlib
 import textwrap
+import threading
+import time
+import multiprocessing
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import groupby
 from jinja2 import Environment
+try:
+    from jinja2 import pass_context
+except ImportError:  # jinja2 < 3.0
+    from jinja2 import contextfilter as pass_context
 try:
     from collections import OrderedDict
 except ImportError:
     from ordereddict import OrderedDict
 
+__all__ = [
+    'CacheInfo', 'ColumnarConnections', 'ComponentNode', 'ConnectionNode', 'DiskRenderCache',
+    'DomainNeedsConnectionNode', 'DomainNode', 'DomainProvidesConnectionNode', 'Fingerprint', 'HighlightSet',
+    'MemoryRenderCache', 'Mesh', 'NodeIds', 'RenderStats', 'ResourceConnectionNode', 'TemplateCache',
+    'DuplicateEntry', 'InvalidBatch', 'InvalidComponent', 'InvalidConnection', 'InvalidDomain', 'InvalidPort',
+    'InvalidResource',
+    'DETAIL_COMPONENTS', 'DETAIL_FULL', 'DETAIL_OVERVIEW', 'DOT_FILTERS', 'DOT_TEMPLATE', 'NODE_IDS_COMPACT',
+    'NODE_IDS_MD5',
+    'clear_template_cache', 'iter_mesh_as_dot', 'render', 'render_iter', 'render_many', 'render_mesh_as_dot',
+    'render_to', 'template_cache_info', 'write_mesh_as_dot',
+]
+
+# Plain dicts preserve insertion order from Python 3.7 and are much more compact than OrderedDict, so use them for the
+# per-element ordered collections of large meshes where available.
+_ordered_dict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+
+# guards state that is updated lazily when reading a mesh, which may happen from several threads at once
+_lazy_state_lock = threading.Lock()
+
+
+@contextmanager
+def _gc_paused():
+    """Suspends the cyclic garbage collector, which otherwise repeatedly scans the mesh while large batches of
+    elements are being allocated.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
 
 class DuplicateEntry(Exception):
     """Raised when a duplicate element is added to the mesh.
@@ -104,9 +152,101 @@ class InvalidResource(Exception):
     """
 
 
+class InvalidBatch(Exception):
+    """Raised when a bulk operation on the mesh contains invalid entries. None of the entries in the batch are added.
+
+    The individual exceptions for every invalid entry are available as the errors attribute.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        summary = '; '.join(str(e) for e in errors[:5])
+        if len(errors) > 5:
+            summary += '; ...'
+        super(InvalidBatch, self).__init__('{0} invalid entries in batch: {1}'.format(len(errors), summary))
+
+
+class NodeIds(object):
+    """Symbol table of the names used in a mesh, which allocates each name a short integer ID from which compact and
+    collision-free DOT node IDs are derived.
+
+    Names are numbered in the order they are first added to the mesh, so IDs are deterministic and stable for the
+    lifetime of the mesh. Names that were never added, e.g. by custom templates, are given IDs derived from the full MD5
+    digest of the name instead, so rendering never modifies the table and renders of a mesh can run in several threads.
+
+    The table also interns the names: the mesh stores the instance of each name that was first added, so equal names
+    share a single string object, and its cached hash, however many ports, connections and indexes refer to them.
+    """
+    __slots__ = ('_ids', '_names', '_digest', '_digested')
+
+    def __init__(self):
+        self._ids = {}
+        # names in ID order, and a running digest of the first _digested of them
+        self._names = []
+        self._digest = hashlib.md5()
+        self._digested = 0
+
+    def intern(self, name):
+        """Allocates an ID for the given name, unless it already has one, and returns the interned instance of the name.
+
+        :param str name: name of a component, domain label, port or resource
+        :returns: the first instance of the name that was added
+        """
+        index = self._ids.get(name)
+        if index is None:
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+            return name
+        return self._names[index]
+
+    add = intern
+
+    def digest(self):
+        """Returns a digest of the IDs allocated so far, which is only extended by names allocated since the last call.
+        """
+        with _lazy_state_lock:
+            names = self._names
+            if self._digested < len(names):
+                self._digest.update(_encode('\0'.join(names[self._digested:]) + '\0'))
+                self._digested = len(names)
+            return self._digest.hexdigest()
+
+    def index(self, name):
+        """Returns the integer ID of the given name, allocating one if necessary.
+        """
+        try:
+            return self._ids[name]
+        except KeyError:
+            self.add(name)
+            return self._ids[name]
+
+    def node_id(self, name):
+        """Returns the DOT ID for the given name, the compact equivalent of the 'hash' filter.
+        """
+        index = self._ids.get(name)
+        if index is None:
+            # 'x' is not a hex digit so these can never clash with the IDs of names in the table
+            return 'idx' + _md5_hex(name)
+        return 'id{0:x}'.format(index)
+
+    def node_id_p(self, name):
+        """Returns the alternative DOT ID for the given name, the compact equivalent of the 'hash_p' filter.
+        """
+        # 'p' is not a hex digit so these can never clash with IDs from node_id()
+        index = self._ids.get(name)
+        if index is None:
+            return 'idpx' + _md5_hex(name)
+        return 'idp{0:x}'.format(index)
+
+    def __len__(self):
+        return len(self._ids)
+
+
 class ConnectionNode(object):
     """Internal representation of a connection between components within the mesh.
     """
+    __slots__ = ('consumer', 'producer', 'highlighted', '_view')
+
     def __init__(self, consumer, producer):
         """Instantiates a new connection between the given consumer and producer.
 
@@ -116,10 +256,23 @@ class ConnectionNode(object):
         self.consumer = consumer
         self.producer = producer
         self.highlighted = False
+        self._view = None
 
     def as_dict(self):
         """Returns a dict representation of the connection.
+
+        The dict is cached until invalidate() is called, and must be treated as read-only.
+        """
+        if self._view is None:
+            self._view = self._build_dict()
+        return self._view
+
+    def invalidate(self):
+        """Discards the cached dict representation after the connection is modified.
         """
+        self._view = None
+
+    def _build_dict(self):
         consumer_component, consumer_port = self.consumer
         producer_component, producer_port = self.producer
         d = {
@@ -137,18 +290,20 @@ class ConnectionNode(object):
 
 class DomainNeedsConnectionNode(ConnectionNode):
     """Internal representation of component's port being exposed as that of its parent domain."""
+    __slots__ = ()
 
-    def as_dict(self):
-        d = super(DomainNeedsConnectionNode, self).as_dict()
+    def _build_dict(self):
+        d = super(DomainNeedsConnectionNode, self)._build_dict()
         d['domain_export'] = "needs"
         return d
 
 
 class DomainProvidesConnectionNode(ConnectionNode):
     """Internal representation of component's port being exposed as that of its parent domain."""
+    __slots__ = ()
 
-    def as_dict(self):
-        d = super(DomainProvidesConnectionNode, self).as_dict()
+    def _build_dict(self):
+        d = super(DomainProvidesConnectionNode, self)._build_dict()
         d['domain_export'] = "provides"
         return d
 
@@ -156,9 +311,9 @@ class DomainProvidesConnectionNode(ConnectionNode):
 class ResourceConnectionNode(ConnectionNode):
     """Internal representation of a connection between components and resources within the mesh.
     """
-    def as_dict(self):
-        """Returns a dict representation of the connection.
-        """
+    __slots__ = ()
+
+    def _build_dict(self):
         consumer_component, consumer_port = self.consumer
         d = {
             'consumer_component': consumer_component,
@@ -179,12 +334,107 @@ class Mesh(object):
 
     GRAPH_TEMPLATE = ''
 
-    def __init__(self):
-        self.components = OrderedDict()
-        self.connections = OrderedDict()
-        self.resources = []
-        self._highlighted_resource = set()
-        self.connected_consumers = set()
+    def __init__(self, columnar=False):
+        """Instantiates an empty mesh.
+
+        :param bool columnar: hold the connections in a ColumnarConnections store of parallel arrays rather than a
+                              dict of ConnectionNode objects, which uses a fraction of the memory for meshes with
+                              millions of connections. The API of the mesh is the same either way
+        """
+        self.components = _ordered_dict()
+        # resource name -> list of (consumer_component, consumer_port) connected to it, in the order they were added
+        self.resources = _ordered_dict()
+        # highlighted resource names as ordered dict keys, so they are emitted in the order they were highlighted
+        self._highlighted_resource = _ordered_dict()
+        self.node_ids = NodeIds()
+        self._columnar = columnar
+        if columnar:
+            self.connections = ColumnarConnections(self.node_ids)
+            self.connected_consumers = self.connections.consumers
+            # the adjacency indexes are only built when first needed, see _adjacency()
+            self._outgoing = self._incoming = self._incoming_by_port = self._outgoing_by_port = None
+        else:
+            self.connections = _ordered_dict()
+            self.connected_consumers = set()
+            # adjacency indexes of connection keys: consumer label -> keys, producer label -> keys, producer port -> keys,
+            # and consumer port -> keys for the needs and provides labels of domains
+            self._outgoing = {}
+            self._incoming = {}
+            self._incoming_by_port = {}
+            self._outgoing_by_port = {}
+        # incremented on every modification of the mesh. Sections of the as_dict() view model are cached until changed
+        self._version = 0
+        self._view = None
+        self._view_sections = {}
+        # rendered DOT fragments for each element, per node ID scheme, dropped whenever the element is modified
+        self._dot_fragments = {}
+        # maintained from the first call to fingerprint() onwards
+        self._fingerprint = None
+
+    @property
+    def version(self):
+        """Counter that is incremented every time the mesh is modified."""
+        return self._version
+
+    # the kind of rendered fragment affected by a modification to each section of the view model
+    _FRAGMENT_KINDS = {
+        'components': 'components',
+        'domains': 'components',
+        'connections': 'connections',
+        'resources': 'resources',
+        'highlighted_resources': 'resources',
+    }
+
+    def _changed(self, section, *keys):
+        """Records a modification of the mesh.
+
+        :param str section: section of the as_dict() view model affected by the modification
+        :param keys: names (or connection keys) of the elements that were added or modified
+        """
+        self._version += 1
+        self._view = None
+        self._view_sections.pop(section, None)
+
+        if self._fingerprint is not None:
+            self._fingerprint.mark(section, keys)
+
+        if keys and self._dot_fragments:
+            kind = self._FRAGMENT_KINDS[section]
+            for fragments in self._dot_fragments.values():
+                for key in keys:
+                    fragments.pop((kind, key), None)
+
+    def fingerprint(self):
+        """Returns a digest of the structure of the mesh, e.g. to skip re-rendering a mesh that has not changed.
+
+        The fingerprint is a two level Merkle hash: each element is digested together with its position in its section
+        of the as_dict() view model, the element digests are combined into a digest per section, and the section
+        digests into the overall digest. Meshes with the same elements in the same order have the same fingerprint,
+        however they were built. Comparing the sections of two fingerprints tells which parts of the mesh changed, see
+        Fingerprint.changed_sections().
+
+        The fingerprint is maintained incrementally after the first call: a modification only re-digests the elements
+        it affected, and reading an unchanged fingerprint is O(1).
+
+        :returns: Fingerprint of the mesh
+        """
+        if self._fingerprint is None:
+            self._fingerprint = _FingerprintTracker(self)
+        return self._fingerprint.value()
+
+    def _fingerprint_record(self, section, key):
+        """Returns the content of an element that contributes to the fingerprint of the mesh."""
+        if section == 'components' or section == 'domains':
+            c = self.components[key]
+            record = c.name, tuple(c.needs_ports), tuple(c.provides_ports), c.highlighted
+            return record + (tuple(c.children),) if section == 'domains' else record
+        if section == 'connections':
+            return self._connection_record(self.connections[key])
+        return key
+
+    @staticmethod
+    def _section_of(component):
+        return 'domains' if isinstance(component, DomainNode) else 'components'
 
     def add_component(self, component_name, needs_ports=None, provides_ports=None):
         """Adds a component to the mesh.
@@ -197,7 +447,9 @@ class Mesh(object):
         if component_name in self.components:
             raise DuplicateEntry('Component or Domain with name {0} already exists'.format(component_name))
 
+        component_name = self.node_ids.intern(component_name)
         self.components[component_name] = ComponentNode(component_name)
+        self._changed('components', component_name)
 
         needs = needs_ports or tuple()
         for port_name in needs:
@@ -207,6 +459,68 @@ class Mesh(object):
         for port_name in provides:
             self.add_provides_port(component_name, port_name)
 
+    def add_components(self, records):
+        """Adds several components to the mesh in one go.
+
+        The whole batch is validated before anything is added, so either all of the components are added or none are.
+
+        :param records: iterable of dicts with a 'name' and optional 'needs_ports' and 'provides_ports' lists, i.e. in
+                        the same form as the 'components' entry of as_dict()
+        :raises: InvalidBatch listing every invalid entry in the batch
+        """
+        errors = []
+        pending = []
+        batch_names = set()
+        for record in records:
+            name = record['name']
+            needs = record.get('needs_ports') or ()
+            provides = record.get('provides_ports') or ()
+
+            if name in self.components or name in batch_names:
+                errors.append(DuplicateEntry('Component or Domain with name {0} already exists'.format(name)))
+            if len(set(needs)) != len(needs):
+                errors.append(DuplicateEntry('Duplicate needs port names for {0}'.format(name)))
+            if len(set(provides)) != len(provides):
+                errors.append(DuplicateEntry('Duplicate provides port names for {0}'.format(name)))
+
+            batch_names.add(name)
+            pending.append((name, needs, provides))
+
+        if errors:
+            raise InvalidBatch(errors)
+
+        intern = self.node_ids.intern
+        with _gc_paused():
+            for name, needs, provides in pending:
+                name = intern(name)
+                needs = [intern(port_name) for port_name in needs]
+                provides = [intern(port_name) for port_name in provides]
+                self.components[name] = ComponentNode(name, needs, provides)
+        self._changed('components', *[name for name, _, _ in pending])
+
+    def add_resources(self, resource_names):
+        """Adds several resources to the mesh in one go.
+
+        The whole batch is validated before anything is added, so either all of the resources are added or none are.
+
+        :param resource_names: iterable of resource names
+        :raises: InvalidBatch listing every invalid entry in the batch
+        """
+        resource_names = list(resource_names)
+        errors = []
+        batch_names = set()
+        for resource_name in resource_names:
+            if resource_name in self.resources or resource_name in batch_names:
+                errors.append(DuplicateEntry('Resource with name {0} already exists'.format(resource_name)))
+            batch_names.add(resource_name)
+
+        if errors:
+            raise InvalidBatch(errors)
+
+        for resource_name in resource_names:
+            self.resources[self.node_ids.intern(resource_name)] = []
+        self._changed('resources', *resource_names)
+
     def add_resource(self, resource_name):
         """Adds a resource (adapter to external data) to the mesh.
 
@@ -216,7 +530,8 @@ class Mesh(object):
         if resource_name in self.resources:
             raise DuplicateEntry('Resource with name {0} already exists'.format(resource_name))
 
-        self.resources.append(resource_name)
+        self.resources[self.node_ids.intern(resource_name)] = []
+        self._changed('resources', resource_name)
 
     def add_needs_port(self, component_name, port_name):
         """Assigns an additional needs port to an existing component.
@@ -225,7 +540,9 @@ class Mesh(object):
         :param str port_name: name of needs port to add
         :raises: DuplicateEntry if that needs port already exists on the component
         """
-        self.components[component_name].add_needs_port(port_name)
+        component = self.components[component_name]
+        component.add_needs_port(self.node_ids.intern(port_name))
+        self._changed(self._section_of(component), component_name)
 
     def add_provides_port(self, component_name, port_name):
         """Assigns an additional provides port to an existing component.
@@ -234,7 +551,9 @@ class Mesh(object):
         :param str port_name: name of provides port to add
         :raises: DuplicateEntry if that provides port already exists on the component
         """
-        self.components[component_name].add_provides_port(port_name)
+        component = self.components[component_name]
+        component.add_provides_port(self.node_ids.intern(port_name))
+        self._changed(self._section_of(component), component_name)
 
     def add_connection(self, consumer_component, consumer_port, producer_component, producer_port):
         """Adds a connection between a needs port from a consumer component to the provides port of a producer.
@@ -244,23 +563,116 @@ class Mesh(object):
         :param str producer_component: name of the producer component
         :param str producer_port: name of the provides port of the producer
         """
-        try:
-            consumer = self.components[consumer_component]
-            consumer.assert_is_valid_needs_port(consumer_port)
-        except KeyError:
-            raise InvalidComponent('{0} component does not exist in the mesh'.format(consumer_component))
+        consumer = self._needs_endpoint(consumer_component, consumer_port)
+        producer = self._provides_endpoint(producer_component, producer_port)
+        self._add_connection_between_consumer_and_producer(consumer, producer)
+
+    def add_connections(self, connections):
+        """Adds several connections between needs ports and provides ports in one go.
 
+        The whole batch is validated before anything is added, so either all of the connections are added or none are.
+
+        :param connections: iterable of (consumer_component, consumer_port, producer_component, producer_port) tuples
+        :raises: InvalidBatch listing every invalid entry in the batch
+        """
+        components = self.components
+        intern = self.node_ids.intern
+        pending = []
+        errors = []
+        batch_consumers = set()
+        with _gc_paused():
+            for consumer_component, consumer_port, producer_component, producer_port in connections:
+                consumer_node = components.get(consumer_component)
+                producer_node = components.get(producer_component)
+                if (consumer_node is None or consumer_port not in consumer_node.needs_ports or
+                        producer_node is None or producer_port not in producer_node.provides_ports):
+                    try:
+                        self._needs_endpoint(consumer_component, consumer_port)
+                        self._provides_endpoint(producer_component, producer_port)
+                    except (InvalidComponent, InvalidPort) as e:
+                        errors.append(e)
+                    continue
+
+                consumer = consumer_node.label_for_needs, intern(consumer_port)
+                if consumer in self.connected_consumers or consumer in batch_consumers:
+                    errors.append(InvalidConnection('{0} already connected'.format(consumer)))
+                batch_consumers.add(consumer)
+                pending.append((consumer, (producer_node.label_for_provides, intern(producer_port))))
+
+            if errors:
+                raise InvalidBatch(errors)
+
+            self._store_connections(pending, ConnectionNode)
+
+    def add_connections_to_resources(self, connections):
+        """Adds several connections between needs ports and resources in one go.
+
+        The whole batch is validated before anything is added, so either all of the connections are added or none are.
+
+        :param connections: iterable of (consumer_component, consumer_port, resource) tuples
+        :raises: InvalidBatch listing every invalid entry in the batch
+        """
+        pending = []
+        errors = []
+        batch_consumers = set()
+        with _gc_paused():
+            for consumer_component, consumer_port, resource in connections:
+                try:
+                    consumer = self._needs_endpoint(consumer_component, consumer_port)
+                    if resource not in self.resources:
+                        raise InvalidResource('{0} resource does not exist in the mesh'.format(resource))
+                except (InvalidComponent, InvalidPort, InvalidResource) as e:
+                    errors.append(e)
+                    continue
+
+                if consumer in self.connected_consumers or consumer in batch_consumers:
+                    errors.append(InvalidConnection('{0} already connected'.format(consumer)))
+                batch_consumers.add(consumer)
+                pending.append((consumer, self.node_ids.intern(resource)))
+
+            if errors:
+                raise InvalidBatch(errors)
+
+            self._store_connections(pending, ResourceConnectionNode)
+
+    @classmethod
+    def from_records(cls, components=(), resources=(), connections=(), resource_connections=(), columnar=False):
+        """Builds a new mesh using the bulk entry points.
+
+        :param components: iterable of component dicts, see add_components()
+        :param resources: iterable of resource names, see add_resources()
+        :param connections: iterable of connection tuples, see add_connections()
+        :param resource_connections: iterable of connection tuples, see add_connections_to_resources()
+        :param bool columnar: hold the connections in a columnar store, see Mesh()
+        :returns: the new Mesh
+        :raises: InvalidBatch listing every invalid entry of the first invalid batch
+        """
+        mesh = cls(columnar=columnar)
+        mesh.add_components(components)
+        mesh.add_resources(resources)
+        mesh.add_connections(connections)
+        mesh.add_connections_to_resources(resource_connections)
+        return mesh
+
+    def _needs_endpoint(self, component_name, port_name):
         try:
-            producer = self.components[producer_component]
-            producer.assert_is_valid_provides_port(producer_port)
+            component = self.components[component_name]
+            component.assert_is_valid_needs_port(port_name)
         except KeyError:
-            raise InvalidComponent('{0} component does not exist in the mesh'.format(producer_component))
+            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
 
         # FIXME: using label_for_* here leaks the requirements of a specific viz template (dot) to the conceptual model
         #        of the mesh. Not great. This is essentially a hack to get domains working for now. Need to rethink this
-        consumer = consumer.label_for_needs, consumer_port
-        producer = producer.label_for_provides, producer_port
-        self._add_connection_between_consumer_and_producer(consumer, producer)
+        return component.label_for_needs, self.node_ids.intern(port_name)
+
+    def _provides_endpoint(self, component_name, port_name):
+        try:
+            component = self.components[component_name]
+            component.assert_is_valid_provides_port(port_name)
+        except KeyError:
+            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
+
+        return component.label_for_provides, self.node_ids.intern(port_name)
 
     def add_connection_to_resource(self, consumer_component, consumer_port, resource):
         """Adds a connection between a needs port from a consumer component to a resource.
@@ -269,24 +681,282 @@ class Mesh(object):
         :param str consumer_port: name of the needs port of the consumer
         :param str resource: name of resource
         """
-        try:
-            consumer = self.components[consumer_component]
-            consumer.assert_is_valid_needs_port(consumer_port)
-        except KeyError:
-            raise InvalidComponent('{0} component does not exist in the mesh'.format(consumer_component))
+        consumer = self._needs_endpoint(consumer_component, consumer_port)
 
         if resource not in self.resources:
             raise InvalidResource('{0} resource does not exist in the mesh'.format(resource))
 
-        consumer = consumer.label_for_needs, consumer_port
-        self._add_connection_between_consumer_and_producer(consumer, resource, connectionClass=ResourceConnectionNode)
+        self._add_connection_between_consumer_and_producer(consumer, self.node_ids.intern(resource),
+                                                           connectionClass=ResourceConnectionNode)
+
+    def consumers_of_resource(self, resource):
+        """Returns the needs ports connected to a resource, in the order the connections were added.
+
+        :param str resource: name of resource
+        :returns: list of (consumer_component, consumer_port) tuples as they appear in the mesh connections
+        :raises: InvalidResource if the resource does not exist in the mesh
+        """
+        try:
+            return list(self.resources[resource])
+        except KeyError:
+            raise InvalidResource('{0} resource does not exist in the mesh'.format(resource))
 
     def _add_connection_between_consumer_and_producer(self, consumer, producer, connectionClass=ConnectionNode):
         if consumer in self.connected_consumers:
             raise InvalidConnection('{0} already connected'.format(consumer))
 
-        self.connections[consumer, producer] = (connectionClass(consumer, producer))
-        self.connected_consumers.add(consumer)
+        self._store_connection(consumer, producer, connectionClass)
+
+    def _store_connection(self, consumer, producer, connectionClass):
+        self._store_connections(((consumer, producer),), connectionClass)
+
+    def _store_connections(self, pending, connectionClass):
+        resources = self.resources
+        to_resource = connectionClass is ResourceConnectionNode
+
+        if self._columnar:
+            self.connections.add_all(pending, connectionClass)
+            if to_resource:
+                for consumer, producer in pending:
+                    resources[producer].append(consumer)
+            if self._outgoing is not None:
+                self._index_connections(pending)
+        else:
+            connections = self.connections
+            connected_consumers = self.connected_consumers
+            for key in self._index_connections(pending):
+                consumer, producer = key
+                connections[key] = connectionClass(consumer, producer)
+                connected_consumers.add(consumer)
+                if to_resource:
+                    resources[producer].append(consumer)
+
+        self._changed('connections', *pending)
+
+    def _index_connections(self, pending, indexes=None):
+        """Adds connections to the adjacency indexes.
+
+        :param pending: connection keys
+        :param tuple indexes: the indexes to add to, defaulting to those of the mesh
+        :returns: list of the connection keys as indexed, in which the consumers of a port share one producer tuple
+        """
+        outgoing, incoming, incoming_by_port, outgoing_by_port = indexes or (
+            self._outgoing, self._incoming, self._incoming_by_port, self._outgoing_by_port)
+        components = self.components
+        keys = []
+        for consumer, producer in pending:
+            if producer.__class__ is tuple:
+                port_keys = incoming_by_port.get(producer)
+                if port_keys is None:
+                    port_keys = incoming_by_port[producer] = []
+                else:
+                    producer = port_keys[0][1]
+                key = consumer, producer
+                incoming.setdefault(producer[0], []).append(key)
+                port_keys.append(key)
+            else:
+                key = consumer, producer
+            outgoing.setdefault(consumer[0], []).append(key)
+            if consumer[0] not in components:
+                outgoing_by_port.setdefault(consumer, []).append(key)
+            keys.append(key)
+        return keys
+
+    def _adjacency(self):
+        """Returns the adjacency indexes of connection keys: (consumer label -> keys, producer label -> keys,
+        producer port -> keys, consumer port of a domain -> keys).
+
+        A columnar mesh only builds them on the first query, so that large meshes which are only built and rendered
+        never hold a key per connection, and maintains them from then on.
+        """
+        if self._outgoing is None:
+            with _lazy_state_lock:
+                if self._outgoing is None:
+                    outgoing, incoming, incoming_by_port, outgoing_by_port = indexes = {}, {}, {}, {}
+                    self._index_connections(list(self.connections), indexes)
+                    self._incoming, self._incoming_by_port = incoming, incoming_by_port
+                    self._outgoing_by_port = outgoing_by_port
+                    self._outgoing = outgoing  # last, as it marks the indexes as built
+        return self._outgoing, self._incoming, self._incoming_by_port, self._outgoing_by_port
+
+    def consumers_of(self, component_name, port_name=None):
+        """Returns the needs ports connected to the provides ports of a component, in the order they were connected.
+
+        :param str component_name: name of the producer component or domain
+        :param str port_name: if given, only return consumers of this provides port
+        :returns: list of (consumer_component, consumer_port) tuples as they appear in the mesh connections
+        :raises: InvalidComponent if the component does not exist, InvalidPort if the port is not a provides port
+        """
+        try:
+            component = self.components[component_name]
+        except KeyError:
+            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
+
+        _, incoming, incoming_by_port, _ = self._adjacency()
+        if port_name is None:
+            keys = incoming.get(component.label_for_provides, ())
+        else:
+            component.assert_is_valid_provides_port(port_name)
+            keys = incoming_by_port.get((component.label_for_provides, port_name), ())
+
+        return [consumer for consumer, _ in keys]
+
+    def dependencies_of(self, component_name):
+        """Returns what the needs ports of a component are connected to, in the order they were connected.
+
+        :param str component_name: name of the consumer component or domain
+        :returns: list of (producer_component, producer_port) tuples as they appear in the mesh connections, or the
+                  resource name for connections to resources
+        :raises: InvalidComponent if the component does not exist
+        """
+        try:
+            component = self.components[component_name]
+        except KeyError:
+            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
+
+        return [producer for _, producer in self._adjacency()[0].get(component.label_for_needs, ())]
+
+    def _traversal_start(self, name, upstream):
+        """Returns the labels of the named component, domain or resource, and the keys of the connections leading
+        upstream (towards producers) or downstream (towards consumers) from it.
+        """
+        component = self.components.get(name)
+        if component is not None:
+            labels = _ordered_dict.fromkeys((component.label_for_needs, component.label_for_provides))
+            index = self._adjacency()[0 if upstream else 1]
+            return set(labels), [key for label in labels for key in index.get(label, ())]
+
+        if name in self.resources:
+            return set(), [] if upstream else [(consumer, name) for consumer in self.resources[name]]
+
+        raise InvalidComponent('{0} component or resource does not exist in the mesh'.format(name))
+
+    def _traversal_node(self, endpoint):
+        """Returns what a traversal reaching the given (label, port) endpoint continues from: the label of a component,
+        whose ports all belong to the one element, or the endpoint itself for a label of a domain, whose exposed ports
+        each lead to different children and so must not be mixed.
+        """
+        return endpoint[0] if endpoint[0] in self.components else endpoint
+
+    def _walk(self, name, upstream, hops=None):
+        """Traverses the connections of the mesh breadth first, starting from the named component, domain or resource.
+
+        Every connection is visited at most once, so this runs in time linear in the size of the mesh. Domains are
+        traversed through their needs and provides labels port by port, so paths run through the exposed port they
+        reached the domain by, and only that port.
+
+        :returns: list of connection keys in the order they were reached
+        """
+        visited, keys = self._traversal_start(name, upstream)
+        outgoing, incoming, incoming_by_port, outgoing_by_port = self._adjacency()
+        index, index_by_port = (outgoing, outgoing_by_port) if upstream else (incoming, incoming_by_port)
+        traversal_node = self._traversal_node
+        reached = []
+        depth = 1
+        while keys and (hops is None or depth <= hops):
+            next_keys = []
+            for key in keys:
+                reached.append(key)
+                endpoint = key[1] if upstream else key[0]
+                if endpoint.__class__ is not tuple:
+                    continue  # resources have no connections of their own
+                node = traversal_node(endpoint)
+                if node not in visited and endpoint[0] not in visited:
+                    visited.add(node)
+                    next_keys.extend((index_by_port if node.__class__ is tuple else index).get(node, ()))
+            keys = next_keys
+            depth += 1
+        return reached
+
+    def upstream_of(self, name, hops=None):
+        """Returns the connections that the named element transitively depends on, i.e. following each connection from
+        its consumer to its producer.
+
+        :param str name: name of a component, domain or resource
+        :param int hops: if given, only follow connections up to this many hops away
+        :returns: list of connection keys, as used in Mesh.connections, in breadth first order
+        :raises: InvalidComponent if there is no component, domain or resource of that name
+        """
+        return self._walk(name, True, hops)
+
+    def downstream_of(self, name, hops=None):
+        """Returns the connections that transitively depend on the named element, i.e. its blast radius, following each
+        connection from its producer to its consumer.
+
+        :param str name: name of a component, domain or resource
+        :param int hops: if given, only follow connections up to this many hops away
+        :returns: list of connection keys, as used in Mesh.connections, in breadth first order
+        :raises: InvalidComponent if there is no component, domain or resource of that name
+        """
+        return self._walk(name, False, hops)
+
+    def neighbourhood_of(self, name, hops=1):
+        """Returns the connections within the given number of hops of the named element, in either direction.
+
+        :param str name: name of a component, domain or resource
+        :param int hops: maximum number of hops
+        :returns: list of connection keys, as used in Mesh.connections, upstream ones first
+        :raises: InvalidComponent if there is no component, domain or resource of that name
+        """
+        keys = self._walk(name, True, hops)
+        seen = set(keys)
+        keys.extend(key for key in self._walk(name, False, hops) if key not in seen)
+        return keys
+
+    def shortest_path(self, source, target):
+        """Returns the shortest chain of connections through which the source depends on the target.
+
+        :param str source: name of the consumer component or domain
+        :param str target: name of the component, domain or resource depended on
+        :returns: list of connection keys, as used in Mesh.connections, from the source to the target. Empty if the
+                  source is the target, and None if the source does not depend on the target
+        :raises: InvalidComponent if there is no component, domain or resource of either name
+        """
+        visited, keys = self._traversal_start(source, True)
+        if target in self.components:
+            target_labels = self._traversal_start(target, True)[0]
+            if target_labels & visited:
+                return []
+            target_resource = None
+        elif target in self.resources:
+            if target == source:
+                return []
+            target_labels = ()
+            target_resource = target
+        else:
+            raise InvalidComponent('{0} component or resource does not exist in the mesh'.format(target))
+
+        outgoing, _, _, outgoing_by_port = self._adjacency()
+        traversal_node = self._traversal_node
+        reached_by = {}  # traversal node -> key of the connection through which it was first reached
+        while keys:
+            next_keys = []
+            for key in keys:
+                producer = key[1]
+                if producer.__class__ is not tuple:
+                    if producer == target_resource:
+                        return self._path_to(key, reached_by)
+                    continue
+                node = traversal_node(producer)
+                if node in visited or producer[0] in visited:
+                    continue
+                visited.add(node)
+                reached_by[node] = key
+                if producer[0] in target_labels:
+                    return self._path_to(key, reached_by)
+                next_keys.extend((outgoing_by_port if node.__class__ is tuple else outgoing).get(node, ()))
+            keys = next_keys
+        return None
+
+    def _path_to(self, key, reached_by):
+        path = [key]
+        node = self._traversal_node(key[0])
+        while node in reached_by:
+            key = reached_by[node]
+            path.append(key)
+            node = self._traversal_node(key[0])
+        path.reverse()
+        return path
 
     def add_domain(self, domain_name):
         """Creates a domain which groups together components as a single entity.
@@ -297,7 +967,12 @@ class Mesh(object):
         if domain_name in self.components:
             raise DuplicateEntry('Component or Domain with name {0} already exists'.format(domain_name))
 
-        self.components[domain_name] = DomainNode(domain_name)
+        intern = self.node_ids.intern
+        domain_name = intern(domain_name)
+        domain = self.components[domain_name] = DomainNode(domain_name)
+        domain.label_for_provides = intern(domain.label_for_provides)
+        domain.label_for_needs = intern(domain.label_for_needs)
+        self._changed('domains', domain_name)
 
     def add_component_to_domain(self, component_name, domain_name):
         """Adds a component into the given domain.
@@ -324,8 +999,9 @@ class Mesh(object):
         except KeyError:
             raise InvalidDomain('{0} domain does not exist in the mesh'.format(domain_name))
 
-        component.parent = domain_name
-        domain.add_child_component(component_name)
+        component.parent = domain.name
+        domain.add_child_component(component.name)
+        self._changed('domains', domain_name)
 
     def expose_component_needs_port(self, component_name, port_name):
         """Associated a component's need port to that of its parent domain.
@@ -345,10 +1021,12 @@ class Mesh(object):
         except KeyError:
             raise InvalidDomain('Parent domain for {0} component is unspecified or invalid'.format(component_name))
 
+        port_name = self.node_ids.intern(port_name)
         if port_name not in domain.needs_ports:
             domain.add_needs_port(port_name)
+            self._changed('domains', domain.name)
 
-        consumer = component_name, port_name
+        consumer = component.name, port_name
         producer = domain.label_for_needs, port_name
         self._add_connection_between_consumer_and_producer(consumer, producer, connectionClass=DomainNeedsConnectionNode)
 
@@ -370,24 +1048,44 @@ class Mesh(object):
         except KeyError:
             raise InvalidDomain('Parent domain for {0} component is unspecified or invalid'.format(component_name))
 
+        port_name = self.node_ids.intern(port_name)
         if port_name in domain.provides_ports:
             raise DuplicateEntry('{0} domain already has exposed provides port for {1}'.format(domain.name, port_name))
         else:
             domain.add_provides_port(port_name)
+            self._changed('domains', domain.name)
 
         consumer = domain.label_for_provides, port_name
-        producer = component_name, port_name
+        producer = component.name, port_name
         self._add_connection_between_consumer_and_producer(consumer, producer, connectionClass=DomainProvidesConnectionNode)
 
+    def _existing_component(self, component_name):
+        try:
+            return self.components[component_name]
+        except KeyError:
+            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
+
+    def _existing_connection(self, consumer, producer):
+        try:
+            return self.connections[consumer, producer]
+        except KeyError:
+            raise InvalidConnection('Invalid Connection: {0} -> {1}'.format(consumer, producer))
+
+    def _assert_is_valid_resource(self, resource):
+        if resource not in self.resources:
+            raise InvalidResource('{0} resource does not exist in the mesh'.format(resource))
+
     def highlight_component(self, component_name):
         """Highlights a component in the mesh.
 
+        To highlight elements for a single render without modifying the mesh, use a HighlightSet instead.
+
         :param str component_name: name of component to highlight
         """
-        try:
-            self.components[component_name].highlighted = True
-        except KeyError:
-            raise InvalidComponent('{0} component does not exist in the mesh'.format(component_name))
+        component = self._existing_component(component_name)
+        component.highlighted = True
+        component.invalidate()
+        self._changed(self._section_of(component), component_name)
 
     def highlight_connection(self, consumer_component, consumer_port, producer_component, producer_port):
         """Highlights a connection between a needs port from a consumer component to the provides port of a producer.
@@ -399,10 +1097,26 @@ class Mesh(object):
         """
         consumer = consumer_component, consumer_port
         producer = producer_component, producer_port
-        try:
-            self.connections[consumer, producer].highlighted = True
-        except KeyError:
-            raise InvalidConnection('Invalid Connection: {0} -> {1}'.format(consumer, producer))
+        self._existing_connection(consumer, producer)
+        self._highlight_stored_connection((consumer, producer))
+        self._changed('connections', (consumer, producer))
+
+    def highlight_connections(self, keys):
+        """Highlights several connections in one go, e.g. the result of upstream_of() or shortest_path().
+
+        :param keys: iterable of connection keys, as used in Mesh.connections
+        :raises: InvalidBatch listing every unknown connection, in which case none are highlighted
+        """
+        connections = self.connections
+        keys = list(keys)
+        errors = [InvalidConnection('Invalid Connection: {0} -> {1}'.format(*key)) for key in keys
+                  if key not in connections]
+        if errors:
+            raise InvalidBatch(errors)
+
+        for key in keys:
+            self._highlight_stored_connection(key)
+        self._changed('connections', *keys)
 
     def highlight_connection_to_resource(self, consumer_component, consumer_port, resource):
         """Highlights a connection between a needs port and a resource.
@@ -412,51 +1126,231 @@ class Mesh(object):
         :param str resource: name of resource
         """
         consumer = consumer_component, consumer_port
-        try:
-            self.connections[consumer, resource].highlighted = True
-        except KeyError:
-            raise InvalidConnection('Invalid Connection: {0} -> {1}'.format(consumer, resource))
+        self._existing_connection(consumer, resource)
+        self._highlight_stored_connection((consumer, resource))
+        self._changed('connections', (consumer, resource))
+
+    def _highlight_stored_connection(self, key):
+        if self._columnar:
+            self.connections.highlight(key)
+        else:
+            connection = self.connections[key]
+            connection.highlighted = True
+            connection.invalidate()
 
     def highlight_resource(self, resource):
         """Highlights a resource in the mesh.
 
         :param str resource: name of resource to highlight
         """
-        if resource not in self.resources:
-            raise InvalidResource('{0} resource does not exist in the mesh'.format(resource))
-
-        self._highlighted_resource.add(resource)
+        self._assert_is_valid_resource(resource)
+        self._highlighted_resource[self.node_ids.intern(resource)] = None
+        self._changed('highlighted_resources', resource)
 
     def as_dict(self):
         """Returns a dict representation of the mesh.
+
+        The representation is cached until the mesh is next modified, and only the sections and elements affected by a
+        modification are rebuilt. It is shared between callers so must be treated as read-only.
         """
+        if self._view is not None:
+            return self._view
+
         d = {
-            'components': [c.as_dict() for c in self.components.values() if not isinstance(c, DomainNode)],
-            'domains': [c.as_dict() for c in self.components.values() if isinstance(c, DomainNode)],
-            'connections': [c.as_dict() for c in self.connections.values()],
-            'resources': [r for r in self.resources],
+            'components': self._view_section('components'),
+            'domains': self._view_section('domains'),
+            'connections': self._view_section('connections'),
+            'resources': self._view_section('resources'),
         }
 
         if self._highlighted_resource:
-            d['highlighted_resources'] = list(self._highlighted_resource)
+            d['highlighted_resources'] = self._view_section('highlighted_resources')
 
+        self._view = d
         return d
 
+    def _view_section(self, section):
+        try:
+            return self._view_sections[section]
+        except KeyError:
+            pass
+
+        if section == 'components':
+            value = [c.as_dict() for c in self.components.values() if not isinstance(c, DomainNode)]
+        elif section == 'domains':
+            value = [c.as_dict() for c in self.components.values() if isinstance(c, DomainNode)]
+        elif section == 'connections':
+            value = [c.as_dict() for c in self.connections.values()]
+        elif section == 'resources':
+            value = list(self.resources)
+        else:
+            value = list(self._highlighted_resource)
+
+        self._view_sections[section] = value
+        return value
+
+    # connection classes as numbered in the pickled form of the mesh
+    _CONNECTION_CLASSES = (ConnectionNode, DomainNeedsConnectionNode, DomainProvidesConnectionNode,
+                           ResourceConnectionNode)
+
+    def __getstate__(self):
+        """Returns the compact form of the mesh used for pickling.
+
+        This holds only the elements of the mesh as plain tuples. The indexes and caches are rebuilt on unpickling.
+        """
+        components = [self._component_record(c) for c in self.components.values()]
+        connections = [self._connection_record(c) for c in self.connections.values()]
+        return (components, list(self.resources), connections, list(self._highlighted_resource),
+                list(self.node_ids._names), self._version, self._columnar)
+
+    def __setstate__(self, state):
+        components, resources, connections, highlighted_resources, node_names, version, columnar = state
+        self.__init__(columnar)
+        for name in node_names:
+            self.node_ids.intern(name)
+        self._load_records(components, resources, connections, highlighted_resources)
+
+        self._version = version
+        self._view = None
+        self._view_sections.clear()
+
+    @staticmethod
+    def _component_record(c, children=None):
+        if isinstance(c, DomainNode):
+            return (True, c.name, tuple(c.needs_ports), tuple(c.provides_ports), c.highlighted,
+                    tuple(c.children if children is None else children))
+        return False, c.name, tuple(c.needs_ports), tuple(c.provides_ports), c.highlighted, c.parent
+
+    def _connection_record(self, c):
+        return self._CONNECTION_CLASSES.index(type(c)), c.consumer, c.producer, c.highlighted
+
+    def _load_records(self, components, resources, connections, highlighted_resources):
+        """Adds the elements held in the compact form of a mesh (see __getstate__) to this mesh, without validation.
+        """
+        intern = self.node_ids.intern
+
+        def interned_endpoint(endpoint):
+            return (intern(endpoint[0]), intern(endpoint[1])) if endpoint.__class__ is tuple else intern(endpoint)
+
+        with _gc_paused():
+            for is_domain, name, needs_ports, provides_ports, highlighted, related in components:
+                name = intern(name)
+                needs_ports = [intern(port_name) for port_name in needs_ports]
+                provides_ports = [intern(port_name) for port_name in provides_ports]
+                if is_domain:
+                    node = DomainNode(name)
+                    node.label_for_provides = intern(node.label_for_provides)
+                    node.label_for_needs = intern(node.label_for_needs)
+                    node.needs_ports = _ordered_dict.fromkeys(needs_ports)
+                    node.provides_ports = _ordered_dict.fromkeys(provides_ports)
+                    node.children.update((intern(child), None) for child in related)
+                else:
+                    node = ComponentNode(name, needs_ports, provides_ports)
+                    node.parent = None if related is None else intern(related)
+                node.highlighted = highlighted
+                self.components[name] = node
+
+            self.resources.update((intern(r), []) for r in resources)
+            self._highlighted_resource.update((intern(r), None) for r in highlighted_resources)
+
+            for class_index, group in groupby(connections, lambda record: record[0]):
+                group = list(group)
+                self._store_connections([(interned_endpoint(consumer), interned_endpoint(producer))
+                                         for _, consumer, producer, _ in group],
+                                        self._CONNECTION_CLASSES[class_index])
+                for _, consumer, producer, highlighted in group:
+                    if highlighted:
+                        self._highlight_stored_connection((consumer, producer))
+
+    def _owner_of_label(self, label):
+        """Returns the name of the component or domain that a connection label belongs to."""
+        if label in self.components:
+            return label
+        for suffix in ('__needs', '__provides'):
+            if label.endswith(suffix):
+                return label[:-len(suffix)]
+        raise InvalidComponent('{0} is not the label of a component or domain in the mesh'.format(label))
+
+    def subgraph(self, names, depth=1):
+        """Extracts the neighbourhood of the given elements into a new mesh, e.g. to render a focused diagram of part of
+        a mesh that is too large to render as a whole.
+
+        The new mesh holds every component, domain and resource within the given number of hops of the named elements in
+        either direction (see neighbourhood_of()), together with all the connections between them. Paths through a
+        domain only continue from the exposed port they reached it by, so the elements connected to its other ports are
+        left out unless they are within reach through those ports themselves. Components keep all of their ports,
+        domains of included components are included with their exposed ports, and highlights are preserved. The subgraph
+        is found through the adjacency indexes, so its cost depends on the size of the neighbourhood rather than that of
+        the mesh.
+
+        :param names: iterable of names of components, domains or resources
+        :param int depth: maximum number of hops from the named elements
+        :returns: the new Mesh
+        :raises: InvalidComponent if there is no component, domain or resource of one of the names
+        """
+        components = self.components
+        included = _ordered_dict()  # names of the components and domains to include, in the order they were reached
+        resources = _ordered_dict()
+        for name in names:
+            if name in components:
+                included[name] = None
+            elif name in self.resources:
+                resources[name] = None
+            for key in self.neighbourhood_of(name, depth):
+                consumer, producer = key
+                included[self._owner_of_label(consumer[0])] = None
+                if producer.__class__ is tuple:
+                    included[self._owner_of_label(producer[0])] = None
+                else:
+                    resources[producer] = None
+
+        for name in list(included):
+            parent = components[name].parent
+            if parent is not None:
+                included[parent] = None
+
+        connections = []
+        outgoing = self._adjacency()[0]
+        for name in included:
+            node = components[name]
+            for label in _ordered_dict.fromkeys((node.label_for_needs, node.label_for_provides)):
+                for key in outgoing.get(label, ()):
+                    producer = key[1]
+                    if (producer in resources if producer.__class__ is not tuple
+                            else self._owner_of_label(producer[0]) in included):
+                        connections.append(self._connection_record(self.connections[key]))
+
+        records = []
+        for name in included:
+            node = components[name]
+            children = [c for c in node.children if c in included] if isinstance(node, DomainNode) else None
+            records.append(self._component_record(node, children))
+
+        mesh = Mesh(self._columnar)
+        mesh._load_records(records, list(resources), connections,
+                           [r for r in resources if r in self._highlighted_resource])
+        return mesh
+
 
 class ComponentNode(object):
     """Internal representation of a Component within the mesh.
     """
+    __slots__ = ('name', 'needs_ports', 'provides_ports', 'highlighted', 'parent', '_view')
 
-    def __init__(self, name):
+    def __init__(self, name, needs_ports=(), provides_ports=()):
         """Instantiates the component node with a given name
 
         :param str name: component name
+        :param list needs_ports: initial needs ports, assumed to be unique
+        :param list provides_ports: initial provides ports, assumed to be unique
         """
         self.name = name
-        self.needs_ports = []
-        self.provides_ports = []
+        # ports are held as ordered dict keys, giving O(1) membership tests while preserving the order they were added
+        self.needs_ports = _ordered_dict.fromkeys(needs_ports)
+        self.provides_ports = _ordered_dict.fromkeys(provides_ports)
         self.highlighted = False
         self.parent = None
+        self._view = None
 
     def add_needs_port(self, port_name):
         """Assigns a needs port.
@@ -467,7 +1361,8 @@ class ComponentNode(object):
         if port_name in self.needs_ports:
             raise DuplicateEntry('Needs port with name {0} already exists for {1}'.format(port_name, self.name))
 
-        self.needs_ports.append(port_name)
+        self.needs_ports[port_name] = None
+        self._view = None
 
     def add_provides_port(self, port_name):
         """Assigns a provides port.
@@ -478,11 +1373,24 @@ class ComponentNode(object):
         if port_name in self.provides_ports:
             raise DuplicateEntry('Provides port with name {0} already exists for {1}'.format(port_name, self.name))
 
-        self.provides_ports.append(port_name)
+        self.provides_ports[port_name] = None
+        self._view = None
 
     def as_dict(self):
         """Returns a dict representation of the component.
+
+        The dict is cached until the component is modified, and must be treated as read-only.
         """
+        if self._view is None:
+            self._view = self._build_dict()
+        return self._view
+
+    def invalidate(self):
+        """Discards the cached dict representation after the component is modified.
+        """
+        self._view = None
+
+    def _build_dict(self):
         d = {
             'name': self.name,
             'needs_ports': list(self.needs_ports),
@@ -518,15 +1426,25 @@ class ComponentNode(object):
 
 
 class DomainNode(ComponentNode):
+    # the labels are derived from the name once, rather than on every access
+    __slots__ = ('children', 'label_for_needs', 'label_for_provides')
+
     def __init__(self, name):
         """Instantiates the domain node with a given name
 
         :param str name: domain name
         """
         self.name = name
-        self.needs_ports = []
-        self.provides_ports = []
-        self.children = set()
+        self.needs_ports = _ordered_dict()
+        self.provides_ports = _ordered_dict()
+        self.highlighted = False
+        self.parent = None
+        # child component names as ordered dict keys, so they are emitted in the order they were added
+        self.children = _ordered_dict()
+        self._view = None
+        # labels used by connections to differentiate between needs and provides placeholders of components
+        self.label_for_needs = name + "__needs"
+        self.label_for_provides = name + "__provides"
 
     def add_child_component(self, component_name):
         """Adds a component as a child to this domain.
@@ -537,11 +1455,10 @@ class DomainNode(ComponentNode):
         if component_name in self.children:
             raise DuplicateEntry('{0} component is already a child of {1} domain'.format(component_name, self.name))
         
-        self.children.add(component_name)
+        self.children[component_name] = None
+        self._view = None
 
-    def as_dict(self):
-        """Returns a dict representation of the component.
-        """
+    def _build_dict(self):
         d = {
             'name': self.name,
             'needs_ports': list(self.needs_ports),
@@ -552,16 +1469,6 @@ class DomainNode(ComponentNode):
         }
         return d
 
-    @property
-    def label_for_needs(self):
-        """Label used by connections to differentiate between needs and provides placeholders of components."""
-        return self.name + "__needs"
-
-    @property
-    def label_for_provides(self):
-        """Label used by connections to differentiate between needs and provides placeholders of components."""
-        return self.name + "__provides"
-
     def assert_is_valid_needs_port(self, port_name):
         """Raises InvalidPort if given port is not a valid needs port.
         """
@@ -575,22 +1482,475 @@ class DomainNode(ComponentNode):
             raise InvalidPort('{0} is not a valid provides port for component {1}'.format(port_name, self.name))
 
 
-def render(mesh, template, custom_filters=None):
+class HighlightSet(object):
+    """Set of highlighted elements of a mesh, rendered as an overlay on the mesh rather than being stored in it.
+
+    Pass a highlight set to render() or render_mesh_as_dot() to render the mesh with those elements highlighted. Any
+    number of highlight sets can be rendered against the same mesh without copying or modifying it. Elements
+    highlighted on the mesh itself remain highlighted.
+    """
+
+    def __init__(self, mesh):
+        """Instantiates an empty highlight set for the given mesh.
+
+        :param Mesh mesh: the mesh whose elements are to be highlighted, used to validate them
+        """
+        self.mesh = mesh
+        self.components = set()
+        # connection keys, as used in Mesh.connections
+        self.connections = set()
+        self.resources = set()
+
+    def highlight_component(self, component_name):
+        """Highlights a component, see Mesh.highlight_component().
+
+        :param str component_name: name of component to highlight
+        :returns: this highlight set
+        """
+        self.mesh._existing_component(component_name)
+        self.components.add(component_name)
+        return self
+
+    def highlight_connection(self, consumer_component, consumer_port, producer_component, producer_port):
+        """Highlights a connection between components, see Mesh.highlight_connection().
+
+        :param str consumer_component: name of the consumer component
+        :param str consumer_port: name of the needs port of the consumer
+        :param str producer_component: name of the producer component
+        :param str producer_port: name of the provides port of the producer
+        :returns: this highlight set
+        """
+        key = (consumer_component, consumer_port), (producer_component, producer_port)
+        self.mesh._existing_connection(*key)
+        self.connections.add(key)
+        return self
+
+    def highlight_connection_to_resource(self, consumer_component, consumer_port, resource):
+        """Highlights a connection between a needs port and a resource, see Mesh.highlight_connection_to_resource().
+
+        :param str consumer_component: name of the consumer component
+        :param str consumer_port: name of the needs port of the consumer
+        :param str resource: name of resource
+        :returns: this highlight set
+        """
+        key = (consumer_component, consumer_port), resource
+        self.mesh._existing_connection(*key)
+        self.connections.add(key)
+        return self
+
+    def highlight_connections(self, keys):
+        """Highlights several connections in one go, see Mesh.highlight_connections().
+
+        :param keys: iterable of connection keys, as used in Mesh.connections
+        :returns: this highlight set
+        """
+        connections = self.mesh.connections
+        keys = list(keys)
+        errors = [InvalidConnection('Invalid Connection: {0} -> {1}'.format(*key)) for key in keys
+                  if key not in connections]
+        if errors:
+            raise InvalidBatch(errors)
+
+        self.connections.update(keys)
+        return self
+
+    def highlight_resource(self, resource):
+        """Highlights a resource, see Mesh.highlight_resource().
+
+        :param str resource: name of resource to highlight
+        :returns: this highlight set
+        """
+        self.mesh._assert_is_valid_resource(resource)
+        self.resources.add(resource)
+        return self
+
+    def as_dict(self, mesh):
+        """Returns the dict representation of the given mesh with this highlight set applied, see Mesh.as_dict().
+
+        Only the sections and elements that are highlighted are copied. Everything else is shared with the cached
+        representation of the mesh, so the result must be treated as read-only.
+        """
+        view = mesh.as_dict()
+        if not (self.components or self.connections or self.resources):
+            return view
+
+        d = dict(view)
+        if self.components:
+            d['components'] = [_with_highlight(c) if c['name'] in self.components else c for c in view['components']]
+        if self.connections:
+            d['connections'] = [_with_highlight(c) if key in self.connections else c
+                                for key, c in zip(mesh.connections, view['connections'])]
+        if self.resources:
+            highlighted = view.get('highlighted_resources', [])
+            d['highlighted_resources'] = highlighted + [
+                r for r in mesh.resources if r in self.resources and r not in mesh._highlighted_resource]
+        return d
+
+
+def _with_highlight(element):
+    if element.get('highlighted'):
+        return element
+    d = dict(element)
+    d['highlighted'] = True
+    return d
+
+
+def _view_of(mesh, highlights):
+    return mesh.as_dict() if highlights is None else highlights.as_dict(mesh)
+
+
+class Fingerprint(namedtuple('Fingerprint', ['digest', 'components', 'domains', 'resources',
+                                             'highlighted_resources', 'connections'])):
+    """Fingerprint of a mesh, see Mesh.fingerprint(). Holds the overall digest and the digest of each section, all as
+    hex strings.
+    """
+    __slots__ = ()
+
+    def changed_sections(self, other):
+        """Returns the names of the sections that differ between this fingerprint and another one.
+        """
+        return [section for section in self._fields[1:] if getattr(self, section) != getattr(other, section)]
+
+
+class _FingerprintTracker(object):
+    """Incrementally maintained fingerprint of a mesh.
+
+    Each section digest is the sum, modulo 2**128, of the digests of its elements combined with their positions, so an
+    element can be added or re-digested in O(1) by adjusting the sum. Modified elements are only marked when the mesh
+    changes, and re-digested on the next read.
+    """
+    SECTIONS = Fingerprint._fields[1:]
+    MODULUS = 1 << 128
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.sums = dict((section, 0) for section in self.SECTIONS)
+        # section -> element key -> (position, contribution to the section sum)
+        self.terms = dict((section, {}) for section in self.SECTIONS)
+        # section -> keys of the elements to (re-)digest, in the order they were added or modified
+        self.dirty = dict((section, _ordered_dict()) for section in self.SECTIONS)
+        self.fingerprint = None
+
+        components = mesh.components
+        self.mark('components', [name for name, c in components.items() if not isinstance(c, DomainNode)])
+        self.mark('domains', [name for name, c in components.items() if isinstance(c, DomainNode)])
+        self.mark('resources', mesh.resources)
+        self.mark('highlighted_resources', mesh._highlighted_resource)
+        self.mark('connections', mesh.connections)
+
+    def mark(self, section, keys):
+        self.dirty[section].update((key, None) for key in keys)
+        self.fingerprint = None
+
+    def value(self):
+        with _lazy_state_lock:
+            if self.fingerprint is None:
+                self.fingerprint = self._compute()
+            return self.fingerprint
+
+    def _compute(self):
+        for section in self.SECTIONS:
+            dirty = self.dirty[section]
+            if not dirty:
+                continue
+            terms = self.terms[section]
+            total = self.sums[section]
+            for key in dirty:
+                position, term = terms.get(key, (len(terms), 0))
+                new_term = int(_md5_hex(repr((position, self.mesh._fingerprint_record(section, key)))), 16)
+                terms[key] = position, new_term
+                total += new_term - term
+            self.sums[section] = total % self.MODULUS
+            dirty.clear()
+
+        sections = ['{0:032x}'.format(self.sums[section]) for section in self.SECTIONS]
+        return Fingerprint(_md5_hex(' '.join(sections)), *sections)
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class TemplateCache(object):
+    """Bounded (LRU) cache of compiled jinja2 templates.
+
+    Templates are keyed by the template text together with the set of custom filters they were compiled with, so
+    repeated renders using the same template skip parsing and compilation entirely.
+    """
+
+    def __init__(self, maxsize=64):
+        """Instantiates an empty cache.
+
+        :param int maxsize: maximum number of compiled templates to retain
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_template(self, template, custom_filters=None, count_filter_calls=False):
+        """Returns a compiled jinja2 template, compiling and caching it on first use.
+
+        :param str template: the template text
+        :param dict custom_filters: dict of custom filters where the key is the filter tag and the value is the callables
+        :param bool count_filter_calls: compile the template with the custom filters wrapped to count their calls into
+                                        the RenderStats of the render in progress, cached apart from the plain template
+        :returns: compiled jinja2 template
+        """
+        key = (template, frozenset(custom_filters.items()) if custom_filters else frozenset(), count_filter_calls)
+
+        with self._lock:
+            jinja_template = self._templates.pop(key, None)
+            if jinja_template is not None:
+                self._templates[key] = jinja_template  # re-insert as most recently used
+                self.hits += 1
+                return jinja_template
+            self.misses += 1
+
+        jinja_env = Environment()
+        if custom_filters:
+            if count_filter_calls:
+                custom_filters = dict((name, _counting_filter(name, function))
+                                      for name, function in custom_filters.items())
+            jinja_env.filters.update(custom_filters)
+        jinja_template = jinja_env.from_string(template)
+
+        with self._lock:
+            self._templates[key] = jinja_template
+            while len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+
+        return jinja_template
+
+    def clear(self):
+        """Discards all compiled templates and resets the hit/miss counters.
+        """
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Returns a CacheInfo tuple of (hits, misses, maxsize, currsize).
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._templates))
+
+
+_template_cache = TemplateCache()
+
+
+def template_cache_info():
+    """Returns hit/miss statistics for the process-wide compiled template cache used by render().
+    """
+    return _template_cache.info()
+
+
+def clear_template_cache():
+    """Discards all templates held in the process-wide compiled template cache used by render().
+    """
+    _template_cache.clear()
+
+
+# time.perf_counter() is not available on Python 2
+_timer = getattr(time, 'perf_counter', time.time)
+
+# the RenderStats of the render in progress on each thread, which the filters wrapped by _counting_filter() count into
+_active_stats = threading.local()
+
+
+class RenderStats(object):
+    """Opt-in instrumentation of a render, filled in by the render functions it is passed to as stats.
+
+    timings maps each phase of the render to the seconds spent in it:
+
+        view     building the view model of the mesh (Mesh.as_dict() and highlights), for jinja2 templates only
+        compile  fetching the template from the compiled template cache, and compiling it on a miss
+        render   producing the output, including the time spent in filters
+        output   joining the output into a single string, or writing it to the file-like object
+
+    counters maps names to counts: the nodes (components, domains and resources) and edges (connections) of the mesh,
+    and the chunks, characters and UTF-8 encoded bytes of the output.
+
+    filter_calls maps the name of each custom filter to the number of times it was called. The native DOT_TEMPLATE
+    emitter, which does not use filters, reports the lookups of node IDs (hash and hash_p) and escaped labels (escape)
+    instead, including those served from its per-render memo.
+
+    Instrumented jinja2 renders use a separately compiled template, whose filters are wrapped to count their calls.
+    A RenderStats accumulates over every render it is passed to, and must not be shared between concurrent renders.
+    """
+
+    def __init__(self, on_complete=None):
+        """Instantiates empty statistics.
+
+        :param on_complete: optional callable, called with this RenderStats once each render has completed, e.g. to
+                            export the statistics to a metrics system. For the functions returning an iterator, this
+                            is once the iterator is exhausted
+        """
+        self.timings = _ordered_dict()
+        self.counters = _ordered_dict()
+        self.filter_calls = _ordered_dict()
+        self.on_complete = on_complete
+
+    def add_time(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_filter_calls(self, name, n=1):
+        self.filter_calls[name] = self.filter_calls.get(name, 0) + n
+
+    @contextmanager
+    def timed(self, phase):
+        """Context manager adding the time spent within it to the given phase."""
+        start = _timer()
+        try:
+            yield
+        finally:
+            self.add_time(phase, _timer() - start)
+
+    @property
+    def total_seconds(self):
+        return sum(self.timings.values())
+
+    def as_dict(self):
+        """Returns the statistics as a flat dict, e.g. {'seconds.render': 0.01, 'count.nodes': 3,
+        'filter_calls.hash': 6}, for export to a metrics system.
+        """
+        stats = _ordered_dict(('seconds.' + phase, seconds) for phase, seconds in self.timings.items())
+        stats.update(('count.' + name, n) for name, n in self.counters.items())
+        stats.update(('filter_calls.' + name, n) for name, n in self.filter_calls.items())
+        return stats
+
+    def _count_mesh(self, mesh):
+        self.count('nodes', len(mesh.components) + len(mesh.resources))
+        self.count('edges', len(mesh.connections))
+
+    def _complete(self):
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+
+def _counting_filter(name, function):
+    @functools.wraps(function)  # also copies the marker set on the function by pass_context
+    def counting_filter(*args, **kwargs):
+        stats = getattr(_active_stats, 'stats', None)
+        if stats is not None:
+            stats.count_filter_calls(name)
+        return function(*args, **kwargs)
+    return counting_filter
+
+
+def _instrumented_chunks(chunks, stats):
+    """Passes through the given chunks, adding the time taken to produce each of them to the render phase, and
+    counting them. Filters called while producing a chunk count their calls into stats.
+    """
+    chunks = iter(chunks)
+    while True:
+        previous = getattr(_active_stats, 'stats', None)
+        _active_stats.stats = stats
+        start = _timer()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            stats.add_time('render', _timer() - start)
+            _active_stats.stats = previous
+        stats.count('chunks')
+        stats.count('output_chars', len(chunk))
+        stats.count('output_bytes', len(_encode(chunk)))
+        yield chunk
+
+
+def _completing_chunks(chunks, stats):
+    for chunk in chunks:
+        yield chunk
+    stats._complete()
+
+
+def _assemble(consume, chunks, stats):
+    """Consumes the given instrumented chunks, adding the time spent outside of producing them to the output phase,
+    and completes the render.
+    """
+    rendering = stats.timings.get('render', 0.0)
+    start = _timer()
+    result = consume(chunks)
+    elapsed = _timer() - start
+    stats.add_time('output', elapsed - (stats.timings.get('render', 0.0) - rendering))
+    stats._complete()
+    return result
+
+
+def _instrumented_generate(mesh, template, custom_filters, variables, highlights, stats):
+    stats._count_mesh(mesh)
+    with stats.timed('compile'):
+        jinja_template = _template_cache.get_template(template, custom_filters, count_filter_calls=True)
+    with stats.timed('view'):
+        view = _view_of(mesh, highlights)
+    return _instrumented_chunks(jinja_template.generate(view, **(variables or {})), stats)
+
+
+def render(mesh, template, custom_filters=None, variables=None, highlights=None, stats=None):
     """Renders the given mesh using the template text provided.
 
-    The template and filters should be compatible with jinja2
+    The template and filters should be compatible with jinja2. Compiled templates are cached process-wide (see
+    template_cache_info() and clear_template_cache()) so repeated renders with the same template and filters are cheap.
 
     :param str template: the template text to be used for rendering
     :param dict custom_filters: dict of custom filters where the key is the filter tag and the value is the callables
+    :param dict variables: additional variables made available to the template alongside the mesh
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param RenderStats stats: if given, timings and counters of the render are added to it
     :returns: rendered textual representation of the mesh
     """
-    jinja_env = Environment()
-    if custom_filters:
-        jinja_env.filters.update(custom_filters)
+    if stats is not None:
+        return _assemble(''.join, _instrumented_generate(mesh, template, custom_filters, variables, highlights, stats),
+                         stats)
+
+    jinja_template = _template_cache.get_template(template, custom_filters)
+
+    return jinja_template.render(_view_of(mesh, highlights), **(variables or {}))
+
 
-    jinja_template = jinja_env.from_string(template)
+def render_iter(mesh, template, custom_filters=None, variables=None, highlights=None, stats=None):
+    """Renders the given mesh using the template text provided, yielding the output in chunks.
 
-    return jinja_template.render(mesh.as_dict())
+    Same as render() but built on jinja2's generate(), so the full output never has to be held in memory.
+
+    :param str template: the template text to be used for rendering
+    :param dict custom_filters: dict of custom filters where the key is the filter tag and the value is the callables
+    :param dict variables: additional variables made available to the template alongside the mesh
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param RenderStats stats: if given, timings and counters of the render are added to it
+    :returns: iterator over chunks of the rendered textual representation of the mesh
+    """
+    if stats is not None:
+        return _completing_chunks(
+            _instrumented_generate(mesh, template, custom_filters, variables, highlights, stats), stats)
+
+    jinja_template = _template_cache.get_template(template, custom_filters)
+
+    return jinja_template.generate(_view_of(mesh, highlights), **(variables or {}))
+
+
+def render_to(mesh, template, fp, custom_filters=None, variables=None, highlights=None, stats=None):
+    """Renders the given mesh using the template text provided, writing the output to a file-like object.
+
+    :param str template: the template text to be used for rendering
+    :param fp: file-like object with a write() method accepting text
+    :param dict custom_filters: dict of custom filters where the key is the filter tag and the value is the callables
+    :param dict variables: additional variables made available to the template alongside the mesh
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param RenderStats stats: if given, timings and counters of the render are added to it
+    """
+    if stats is not None:
+        _assemble(lambda chunks: _write_chunks(chunks, fp),
+                  _instrumented_generate(mesh, template, custom_filters, variables, highlights, stats), stats)
+        return
+
+    _write_chunks(render_iter(mesh, template, custom_filters, variables, highlights), fp)
 
 
 DOT_TEMPLATE = textwrap.dedent('''
@@ -683,19 +2043,572 @@ DOT_TEMPLATE = textwrap.dedent('''
 ''').lstrip()
 
 
-def render_mesh_as_dot(mesh, template=DOT_TEMPLATE):
+_ESCAPE_RE = re.compile(r'([{}|"<>])')
+
+
+def _encode(s):
+    return s if isinstance(s, bytes) else s.encode('utf-8')
+
+
+def _md5_hex(s):
+    return hashlib.md5(_encode(s)).hexdigest()
+
+
+def _md5_id(prefix, s):
+    return prefix + _md5_hex(s)[:6]
+
+
+def _dot_hash(s):
+    return _md5_id("id", s)
+
+
+def _dot_hash_p(s):
+    # alternative hash for provides ports to avoid conflicts with needs ports with same name
+    return _md5_id("idp", s)
+
+
+def _dot_escape(s):
+    return _ESCAPE_RE.sub(r'\\\1', s)
+
+
+@pass_context
+def _hash_filter(context, s):
+    symbols = context.get('dot_symbols')
+    if symbols is not None:
+        return symbols.hash[s]
+    node_ids = context.get('node_ids')
+    return _dot_hash(s) if node_ids is None else node_ids.node_id(s)
+
+
+@pass_context
+def _hash_p_filter(context, s):
+    symbols = context.get('dot_symbols')
+    if symbols is not None:
+        return symbols.hash_p[s]
+    node_ids = context.get('node_ids')
+    return _dot_hash_p(s) if node_ids is None else node_ids.node_id_p(s)
+
+
+@pass_context
+def _escape_filter(context, s):
+    symbols = context.get('dot_symbols')
+    return _dot_escape(s) if symbols is None else symbols.escape[s]
+
+
+# Filters are defined once at module level so that the compiled DOT template can be reused from the template cache.
+# The filters look up each name in the per-render symbol table passed in the dot_symbols template variable, if there
+# is one, so that every distinct name is only hashed and escaped once per render. Otherwise, the hash filters use the
+# compact IDs of the NodeIds passed in the node_ids template variable, if there is one, and fall back to (truncated)
+# MD5 hashes of the names.
+DOT_FILTERS = {
+    'hash': _hash_filter,
+    'hash_p': _hash_p_filter,
+    'escape': _escape_filter,
+}
+
+NODE_IDS_COMPACT = 'compact'
+NODE_IDS_MD5 = 'md5'
+
+# levels of detail for render_mesh_as_dot()
+DETAIL_FULL = 'full'
+DETAIL_COMPONENTS = 'components'
+DETAIL_OVERVIEW = 'overview'
+
+
+class _Memo(dict):
+    """Dict that computes and stores missing values using the given function."""
+
+    def __init__(self, function):
+        super(_Memo, self).__init__()
+        self.function = function
+
+    def __missing__(self, key):
+        value = self[key] = self.function(key)
+        return value
+
+
+class _CountingMemo(_Memo):
+    """_Memo that also counts its lookups, for RenderStats."""
+
+    def __init__(self, function):
+        super(_CountingMemo, self).__init__(function)
+        self.lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super(_CountingMemo, self).__getitem__(key)
+
+
+class _DotSymbols(object):
+    """Per-render memo of node IDs and escaped labels, so each distinct name is only hashed/escaped once.
+
+    Used directly by the native DOT_TEMPLATE emitter, and through DOT_FILTERS by other templates.
+    """
+
+    def __init__(self, mesh, node_ids=NODE_IDS_COMPACT, counted=False):
+        memo = _CountingMemo if counted else _Memo
+        if node_ids == NODE_IDS_COMPACT:
+            self.hash = memo(mesh.node_ids.node_id)
+            self.hash_p = memo(mesh.node_ids.node_id_p)
+        else:
+            self.hash = memo(_dot_hash)
+            self.hash_p = memo(_dot_hash_p)
+        self.escape = memo(_dot_escape)
+
+    def count_lookups(self, stats):
+        """Adds the lookups of a counted memo to the filter calls of the given RenderStats, if any."""
+        if stats is not None:
+            for name in ('hash', 'hash_p', 'escape'):
+                stats.count_filter_calls(name, getattr(self, name).lookups)
+
+
+def _check_node_ids(node_ids):
+    if node_ids not in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+        raise ValueError('Unknown node ID scheme {0}'.format(node_ids))
+
+
+def _dot_variables(mesh, node_ids):
+    """Returns the template variables used by DOT_FILTERS, including a fresh symbol table for the render."""
+    _check_node_ids(node_ids)
+    return {
+        'node_ids': mesh.node_ids if node_ids == NODE_IDS_COMPACT else None,
+        'dot_symbols': _DotSymbols(mesh, node_ids),
+    }
+
+
+def _iter_dot_ports(ports, port_ids, escape, bgcolor):
+    for port in ports:
+        yield '\n            <TR><TD PORT="{0}" BGCOLOR="{1}">{2}</TD></TR>\n            '.format(
+            port_ids[port], bgcolor, escape[port])
+
+
+def _dot_component(component, highlighted, sym):
+    parts = [
+        '\n    ', sym.hash[component.name], ' [label=<\n'
+        '    <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4"',
+        ' BGCOLOR="yellow"' if highlighted else '', '>\n'
+        '    <TR>\n'
+        '        <TD COLSPAN="2"> ', sym.escape[component.name], '</TD>\n'
+        '    </TR>\n'
+        '    <TR>\n'
+        '        <TD>\n'
+        '            ',
+    ]
+    if component.provides_ports:
+        parts.append('\n            <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4">\n            ')
+        parts.extend(_iter_dot_ports(component.provides_ports, sym.hash_p, sym.escape, 'grey'))
+        parts.append('\n            </TABLE>\n            ')
+    else:
+        parts.append('&nbsp;')
+    parts.append('\n        </TD>\n        <TD>\n            ')
+    if component.needs_ports:
+        parts.append('\n            <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4">\n            ')
+        parts.extend(_iter_dot_ports(component.needs_ports, sym.hash, sym.escape, 'grey'))
+        parts.append('\n            </TABLE>\n            ')
+    else:
+        parts.append('&nbsp;')
+    parts.append('\n        </TD>\n    </TR>\n\n    </TABLE>>];\n    ')
+    return ''.join(parts)
+
+
+def _dot_domain(domain, sym):
+    domain_id = sym.hash[domain.name]
+    parts = [
+        '\n    subgraph cluster_domain_', domain_id, ' {\n'
+        '        label="', domain.name, '";\n'
+        '        style="rounded";\n'
+        '        rank=same;\n\n        ',
+    ]
+    if domain.provides_ports:
+        parts.extend(('\n        ', sym.hash[domain.label_for_provides],
+                      ' [label=<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="4" CELLPADDING="4">\n            '))
+        parts.extend(_iter_dot_ports(domain.provides_ports, sym.hash_p, sym.escape, 'lightgrey'))
+        parts.append('\n        </TABLE>>];\n        ')
+    parts.extend(('\n\n        subgraph cluster_domain_', domain_id, '_services {\n'
+                  '            style="rounded,dashed";\n'
+                  '            label="";\n\n            '))
+    for child in domain.children:
+        parts.extend(('\n            ', sym.hash[child], ';\n            '))
+    parts.append('\n        }\n\n        ')
+    if domain.needs_ports:
+        parts.extend(('\n        ', sym.hash[domain.label_for_needs],
+                      ' [label=<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="4" CELLPADDING="4">\n            '))
+        parts.extend(_iter_dot_ports(domain.needs_ports, sym.hash, sym.escape, 'lightgrey'))
+        parts.append('\n        </TABLE>>];\n        ')
+    parts.append('\n    }\n    ')
+    return ''.join(parts)
+
+
+def _dot_resource(resource, highlighted, sym):
+    return '\n    {0} [shape="rect";label="{1}", style="dashed"{2}];\n    '.format(
+        sym.hash_p[resource], resource, ', color="red"' if highlighted else '')
+
+
+def _dot_connection(conn, highlighted, sym):
+    (consumer_component, consumer_port), producer = conn.consumer, conn.producer
+    if isinstance(conn, ResourceConnectionNode):
+        return _dot_edge(ResourceConnectionNode, consumer_component, consumer_port, producer, None, highlighted, sym)
+    return _dot_edge(conn.__class__, consumer_component, consumer_port, producer[0], producer[1], highlighted, sym)
+
+
+def _dot_edge(connection_class, consumer_component, consumer_port, producer_component, producer_port, highlighted,
+              sym):
+    """Renders a connection given as the names of its endpoints, with a producer_port of None for resources."""
+    if connection_class is ResourceConnectionNode:
+        return '\n    \n    {0}:{1} -> {2} [style="dashed"{3}];\n    \n    '.format(
+            sym.hash[consumer_component], sym.hash[consumer_port], sym.hash_p[producer_component],
+            ', color="red"' if highlighted else '')
+
+    if connection_class is DomainNeedsConnectionNode:
+        return '\n    \n    \n    {0}:{1} -> {2}:{3} [color="grey",arrowhead="dot"];\n    \n    \n    '.format(
+            sym.hash[consumer_component], sym.hash[consumer_port],
+            sym.hash[producer_component], sym.hash[producer_port])
+    elif connection_class is DomainProvidesConnectionNode:
+        return '\n    \n    \n    {0}:{1} -> {2}:{3} [color="grey",dir="back",arrowtail="dot"];\n    \n    \n    '.format(
+            sym.hash[consumer_component], sym.hash_p[consumer_port],
+            sym.hash[producer_component], sym.hash_p[producer_port])
+    else:
+        return '\n    \n    {0}:{1} -> {2}:{3}{4};\n    \n    '.format(
+            sym.hash[consumer_component], sym.hash[consumer_port],
+            sym.hash[producer_component], sym.hash_p[producer_port],
+            '[color="red"]' if highlighted else '')
+
+
+def _iter_dot(mesh, node_ids=NODE_IDS_COMPACT, incremental=False, highlights=None, stats=None):
+    """Generates the DOT_TEMPLATE output for the given mesh as a sequence of chunks, one per mesh element.
+
+    This walks the mesh directly rather than going through Mesh.as_dict() and jinja2, but the concatenated output is
+    byte-identical to rendering DOT_TEMPLATE with DOT_FILTERS.
+
+    If incremental, the chunk for each element is kept on the mesh and reused by later incremental renders until that
+    element is modified. Elements only highlighted by the given HighlightSet are never cached.
+
+    If stats are given, the lookups of node IDs and escaped labels are added to their filter calls.
+    """
+    sym = _DotSymbols(mesh, node_ids, counted=stats is not None)
+    fragments = mesh._dot_fragments.setdefault(node_ids, {}) if incremental else None
+    overlay = highlights or HighlightSet(mesh)
+
+    def fragment(key, render_fragment, *args):
+        if fragments is None or key is None:
+            return render_fragment(*args + (sym,))
+        try:
+            return fragments[key]
+        except KeyError:
+            value = fragments[key] = render_fragment(*args + (sym,))
+            return value
+
+    yield 'digraph G {\n\n    rankdir=LR;\n    node [shape=plaintext];\n\n    '
+
+    domains = []
+    for name, component in mesh.components.items():
+        if isinstance(component, DomainNode):
+            domains.append(component)
+        elif component.highlighted or name not in overlay.components:
+            yield fragment(('components', name), _dot_component, component, component.highlighted)
+        else:
+            yield fragment(None, _dot_component, component, True)
+    yield '\n\n    '
+
+    for domain in domains:
+        yield fragment(('components', domain.name), _dot_domain, domain)
+    yield '\n\n    '
+
+    highlighted_resources = mesh._highlighted_resource
+    for resource in mesh.resources:
+        if resource in highlighted_resources or resource not in overlay.resources:
+            yield fragment(('resources', resource), _dot_resource, resource, resource in highlighted_resources)
+        else:
+            yield fragment(None, _dot_resource, resource, True)
+    yield '\n\n    '
+
+    connections = mesh.connections
+    if mesh._columnar and fragments is None and not overlay.connections:
+        # scan the columns directly, rather than building a key and a connection for every row
+        names = connections.names
+        classes = Mesh._CONNECTION_CLASSES
+        for consumer_label, consumer_port, producer_label, producer_port, kind, highlighted in zip(
+                connections.consumer_labels, connections.consumer_ports, connections.producer_labels,
+                connections.producer_ports, connections.kinds, connections.highlighted):
+            yield _dot_edge(classes[kind], names[consumer_label], names[consumer_port], names[producer_label],
+                            None if producer_port < 0 else names[producer_port], highlighted, sym)
+    else:
+        for key, conn in connections.items():
+            if conn.highlighted or key not in overlay.connections:
+                yield fragment(('connections', key), _dot_connection, conn, conn.highlighted)
+            else:
+                yield fragment(None, _dot_connection, conn, True)
+    sym.count_lookups(stats)
+    yield '\n}'
+
+
+def _dot_string_escape(s):
+    """Escapes text for use within a double-quoted dot string."""
+    return s.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _summary_dot(mesh, template, node_ids, detail, highlights, stats=None):
+    """Validates the arguments for a render at a reduced level of detail and returns the generator of its output.
+    """
+    if detail not in (DETAIL_COMPONENTS, DETAIL_OVERVIEW):
+        raise ValueError('Unknown level of detail {0}'.format(detail))
+    if not (template is DOT_TEMPLATE or template == DOT_TEMPLATE):
+        raise ValueError('Levels of detail other than DETAIL_FULL can only be rendered with DOT_TEMPLATE')
+
+    _check_node_ids(node_ids)
+    return _iter_dot_summary(mesh, node_ids, detail, highlights, stats)
+
+
+def _iter_dot_summary(mesh, node_ids, detail, highlights, stats=None):
+    """Generates the dot output for the given mesh at a reduced level of detail, as a sequence of chunks.
+
+    Each domain is drawn as a single node in place of its children, and each component either with its port tables
+    (DETAIL_COMPONENTS) or as a plain box (DETAIL_OVERVIEW). The connections are aggregated in a single pass into one
+    edge per pair of nodes, labelled with the number of connections it stands for. Domain export connections, and
+    connections between children of the same domain, are internal to a collapsed domain and are not drawn.
+    """
+    sym = _DotSymbols(mesh, node_ids, counted=stats is not None)
+    overlay = highlights or HighlightSet(mesh)
+    components = mesh.components
+
+    def node_for_label(label):
+        owner = mesh._owner_of_label(label)
+        return components[owner].parent or owner
+
+    node_of = _Memo(node_for_label)
+
+    highlighted = set()
+    for name, component in components.items():
+        if component.highlighted or name in overlay.components:
+            highlighted.add(node_of[name])
+
+    # (source node, target node or resource, is to resource) -> [number of connections, highlighted]
+    edges = _ordered_dict()
+    for key, conn in mesh.connections.items():
+        if conn.__class__ is DomainNeedsConnectionNode or conn.__class__ is DomainProvidesConnectionNode:
+            continue
+        consumer, producer = key
+        to_resource = producer.__class__ is not tuple
+        source = node_of[consumer[0]]
+        target = producer if to_resource else node_of[producer[0]]
+        if source == target and not to_resource:
+            continue
+        edge = edges.get((source, target, to_resource))
+        if edge is None:
+            edge = edges[source, target, to_resource] = [0, False]
+        edge[0] += 1
+        edge[1] = edge[1] or conn.highlighted or key in overlay.connections
+
+    yield 'digraph G {\n\n    rankdir=LR;\n    node [shape=plaintext];\n\n    '
+
+    domains = []
+    for name, component in components.items():
+        if isinstance(component, DomainNode):
+            domains.append(component)
+        elif component.parent is None:
+            if detail == DETAIL_COMPONENTS:
+                yield _dot_component(component, name in highlighted, sym)
+            else:
+                yield '\n    {0} [shape="box";label="{1}"{2}];\n    '.format(
+                    sym.hash[name], _dot_string_escape(name),
+                    ', style="filled", fillcolor="yellow"' if name in highlighted else '')
+    yield '\n\n    '
+
+    for domain in domains:
+        domain_highlighted = domain.name in highlighted
+        yield '\n    {0} [shape="box";style="{1}";label="{2}\\n({3} components)"{4}];\n    '.format(
+            sym.hash[domain.name], 'rounded,bold,filled' if domain_highlighted else 'rounded,bold',
+            _dot_string_escape(domain.name), len(domain.children), ', fillcolor="yellow"' if domain_highlighted else '')
+    yield '\n\n    '
+
+    highlighted_resources = mesh._highlighted_resource
+    for resource in mesh.resources:
+        yield _dot_resource(resource, resource in highlighted_resources or resource in overlay.resources, sym)
+    yield '\n\n    '
+
+    for (source, target, to_resource), (count, edge_highlighted) in edges.items():
+        yield '\n    {0} -> {1} [{2}label="{3}"{4}];\n    '.format(
+            sym.hash[source], sym.hash_p[target] if to_resource else sym.hash[target],
+            'style="dashed", ' if to_resource else '', count, ', color="red"' if edge_highlighted else '')
+    sym.count_lookups(stats)
+    yield '\n}'
+
+
+def _write_chunks(chunks, fp, buffer_size=1 << 16):
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fp.write(''.join(buffered))
+            buffered = []
+            size = 0
+    if buffered:
+        fp.write(''.join(buffered))
+
+
+def _dot_chunks(mesh, template, node_ids, incremental, highlights, detail, stats):
+    """Returns the generator of the dot output, instrumented if stats are given."""
+    if detail != DETAIL_FULL:
+        chunks = _summary_dot(mesh, template, node_ids, detail, highlights, stats)
+    else:
+        _check_node_ids(node_ids)
+        if not (template is DOT_TEMPLATE or template == DOT_TEMPLATE):
+            variables = _dot_variables(mesh, node_ids)
+            if stats is not None:
+                return _instrumented_generate(mesh, template, DOT_FILTERS, variables, highlights, stats)
+            return render_iter(mesh, template, custom_filters=DOT_FILTERS, variables=variables, highlights=highlights)
+        chunks = _iter_dot(mesh, node_ids, incremental, highlights, stats)
+
+    if stats is not None:
+        stats._count_mesh(mesh)
+        chunks = _instrumented_chunks(chunks, stats)
+    return chunks
+
+
+def iter_mesh_as_dot(mesh, template=DOT_TEMPLATE, node_ids=NODE_IDS_COMPACT, incremental=False, highlights=None,
+                     detail=DETAIL_FULL, stats=None):
+    """Renders the given mesh in the Graphviz dot format, yielding the output in chunks.
+
+    :param Mesh mesh: the mesh to be rendered
+    :param str template: alternative template to use
+    :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5, see render_mesh_as_dot()
+    :param bool incremental: reuse unchanged fragments from previous renders, see render_mesh_as_dot()
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param str detail: level of detail, see render_mesh_as_dot()
+    :param RenderStats stats: if given, timings and counters of the render are added to it
+    :returns: iterator over chunks of the dot representation of the mesh
+    """
+    chunks = _dot_chunks(mesh, template, node_ids, incremental, highlights, detail, stats)
+    return chunks if stats is None else _completing_chunks(chunks, stats)
+
+
+def write_mesh_as_dot(mesh, fp, template=DOT_TEMPLATE, node_ids=NODE_IDS_COMPACT, incremental=False,
+                      highlights=None, detail=DETAIL_FULL, stats=None):
+    """Writes the given mesh in the Graphviz dot format to a file-like object.
+
+    The output is produced incrementally and written in bounded chunks, so memory use does not grow with the size of
+    the output.
+
+    :param Mesh mesh: the mesh to be rendered
+    :param fp: file-like object with a write() method accepting text
+    :param str template: alternative template to use
+    :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5, see render_mesh_as_dot()
+    :param bool incremental: reuse unchanged fragments from previous renders, see render_mesh_as_dot()
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param str detail: level of detail, see render_mesh_as_dot()
+    :param RenderStats stats: if given, timings and counters of the render are added to it
+    """
+    chunks = _dot_chunks(mesh, template, node_ids, incremental, highlights, detail, stats)
+    if stats is None:
+        _write_chunks(chunks, fp)
+    else:
+        _assemble(lambda instrumented: _write_chunks(instrumented, fp), chunks, stats)
+
+
+def render_mesh_as_dot(mesh, template=DOT_TEMPLATE, fp=None, node_ids=NODE_IDS_COMPACT, incremental=False,
+                       highlights=None, detail=DETAIL_FULL, stats=None):
     """Renders the given mesh in the Graphviz dot format.
 
+    The default DOT_TEMPLATE is rendered by a native emitter that bypasses jinja2. Alternative templates are rendered
+    through jinja2 using DOT_FILTERS.
+
+    By default, DOT node IDs are the compact IDs allocated by mesh.node_ids, which are unique within the mesh. Pass
+    node_ids=NODE_IDS_MD5 for the previous IDs based on truncated MD5 hashes of the names, which are independent of
+    the mesh but may collide on large meshes.
+
+    With incremental=True, the rendered fragment for each component, domain, resource and connection is kept on the
+    mesh and reused by later incremental renders until that element is modified, so re-rendering a large mesh after a
+    small change only re-renders the elements that changed. This applies to the default DOT_TEMPLATE only.
+
+    For overview diagrams of large meshes, pass detail=DETAIL_COMPONENTS to draw each domain as a single node and
+    aggregate the connections into one edge per pair of nodes, labelled with the number of connections. With
+    detail=DETAIL_OVERVIEW, components are also drawn without their ports. Both require the default DOT_TEMPLATE.
+
+    To find out where the time of a slow render goes, pass a RenderStats as stats.
+
     :param Mesh mesh: the mesh to be rendered
     :param str template: alternative template to use
-    :returns: textual dot representation of the mesh
+    :param fp: if given, the output is streamed to this file-like object instead of being returned
+    :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5
+    :param bool incremental: reuse the fragments of elements not modified since the previous incremental render
+    :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+    :param str detail: DETAIL_FULL (default), DETAIL_COMPONENTS or DETAIL_OVERVIEW
+    :param RenderStats stats: if given, timings and counters of the render are added to it
+    :returns: textual dot representation of the mesh, or None if fp was given
     """
+    if fp is not None:
+        write_mesh_as_dot(mesh, fp, template, node_ids, incremental, highlights, detail, stats)
+        return None
+
+    if stats is not None:
+        return _assemble(''.join, _dot_chunks(mesh, template, node_ids, incremental, highlights, detail, stats), stats)
+
+    if detail != DETAIL_FULL:
+        return ''.join(_summary_dot(mesh, template, node_ids, detail, highlights))
+
+    _check_node_ids(node_ids)
+    if template is DOT_TEMPLATE or template == DOT_TEMPLATE:
+        return ''.join(_iter_dot(mesh, node_ids, incremental, highlights))
+
+    return render(mesh, template, custom_filters=DOT_FILTERS, variables=_dot_variables(mesh, node_ids),
+                  highlights=highlights)
+
+
+def _warm_render_worker(templates):
+    """Initialises a render_many() worker process by compiling the given templates into its template cache."""
+    for template in templates:
+        _template_cache.get_template(template, DOT_FILTERS)
+
+
+def _render_job(job):
+    mesh, template, highlights, node_ids = job
+    return render_mesh_as_dot(mesh, DOT_TEMPLATE if template is None else template, node_ids=node_ids,
+                              highlights=highlights)
+
+
+def render_many(jobs, workers=None, node_ids=NODE_IDS_COMPACT):
+    """Renders many meshes in the Graphviz dot format, spread over a pool of worker processes.
+
+    Meshes are sent to the workers in their compact pickled form, and each worker compiles every distinct custom
+    template once when it starts.
+
+    :param jobs: iterable of jobs, each either a Mesh, a (mesh, template) tuple or a (mesh, template, highlights) tuple
+    :param int workers: number of worker processes, defaults to the number of CPUs. With 1, jobs are rendered in the
+                        calling process
+    :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5, see render_mesh_as_dot()
+    :returns: list of the textual dot representation for each job, in the same order as the jobs
+    """
+    tasks = []
+    templates = []
+    for job in jobs:
+        if isinstance(job, Mesh):
+            mesh, template, highlights = job, DOT_TEMPLATE, None
+        else:
+            mesh, template = job[:2]
+            highlights = job[2] if len(job) > 2 else None
+
+        if template is DOT_TEMPLATE or template == DOT_TEMPLATE:
+            template = None  # no need to ship the default template, which is rendered natively
+        elif template not in templates:
+            templates.append(template)
+        tasks.append((mesh, template, highlights, node_ids))
+
+    if workers is None:
+        workers = os.cpu_count() if hasattr(os, 'cpu_count') else multiprocessing.cpu_count()
+    workers = min(workers or 1, len(tasks))
+
+    if workers <= 1:
+        return [_render_job(task) for task in tasks]
+
+    pool = multiprocessing.Pool(workers, _warm_render_worker, (templates,))
+    try:
+        return pool.map(_render_job, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
 
-    custom_filters = {
-        'hash': lambda s: "id" + hashlib.md5(s).hexdigest()[:6],
-        # alternative hash for provides ports to avoid conflicts with needs ports with same name
-        'hash_p': lambda s: "idp" + hashlib.md5(s).hexdigest()[:6],
-        'escape': lambda s: re.sub(r'([{}|"<>])', r'\\\1', s),
-    }
 
-    return render(mesh, template, custom_filters=custom_filters)
+from hexaviz.cache import DiskRenderCache, MemoryRenderCache  # noqa: E402
+from hexaviz.columnar import ColumnarConnections  # noqa: E402  (depends on the definitions above)
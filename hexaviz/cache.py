@@ -0,0 +1,429 @@
+"""
+Caches of rendered meshes.
+
+Example usage:
+
+        # In a long-running process, keep up to 64MB of renders in memory for at most 10 minutes each
+        cache = MemoryRenderCache(max_bytes=64 << 20, ttl=600)
+        dot = cache.render_mesh_as_dot(m, highlights=incident_highlights)
+
+        # Across runs and processes, keep up to 512MB of renders on disk
+        cache = DiskRenderCache('/var/cache/hexaviz', max_bytes=512 << 20)
+
+        # Rendered on the first call, read back from disk by later calls (from any process) until the mesh changes
+        dot = cache.render_mesh_as_dot(m)
+
+        # Graphviz post-processing can be cached along with the render, keyed by a description of the post-processing
+        svg = cache.render_mesh_as_dot(m, post_process=to_svg, post_process_key='dot -Tsvg')
+"""
+import errno
+import hashlib
+import os
+import tempfile
+import threading
+import sys
+import time
+from collections import namedtuple
+
+from hexaviz import (
+    __version__,
+    CacheInfo,
+    DETAIL_FULL,
+    DOT_FILTERS,
+    DOT_TEMPLATE,
+    NODE_IDS_COMPACT,
+    OrderedDict,
+    render,
+    render_mesh_as_dot,
+)
+
+# bump whenever the layout of the cache, or the meaning of a key, changes
+_FORMAT_VERSION = '1'
+
+# marks whether a cache entry holds text or bytes
+_TEXT = b't'
+_BYTES = b'b'
+
+
+def _key_part(value):
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    return value
+
+
+def _filters_key(filters):
+    """Identifies a set of jinja2 filters by name and by the qualified name of the callable."""
+    return '\0'.join(sorted('{0}={1}.{2}'.format(name, getattr(f, '__module__', ''),
+                                                 getattr(f, '__name__', repr(f)))
+                            for name, f in (filters or {}).items()))
+
+
+def _highlights_key(highlights):
+    if highlights is None:
+        return ''
+    return '\0'.join('\1'.join(sorted(repr(element) for element in elements))
+                     for elements in (highlights.components, highlights.connections, highlights.resources))
+
+
+def _digest_key(*parts):
+    """Returns the cache key for the given parts, each of which is text or bytes."""
+    digest = hashlib.sha256(_key_part(_FORMAT_VERSION))
+    for part in parts:
+        part = _key_part(part)
+        digest.update(_key_part('\0{0}\0'.format(len(part))))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _render_key(mesh, template, filters, highlights, *options):
+    """Returns the cache key for a render, covering everything its output depends on.
+
+    The mesh is identified by its fingerprint, together with the order of its compact node IDs which the fingerprint
+    deliberately does not cover.
+    """
+    return _digest_key(__version__, mesh.fingerprint().digest, mesh.node_ids.digest(), template, _filters_key(filters),
+                       _highlights_key(highlights), *options)
+
+
+def _dot_render_key(mesh, template, node_ids, highlights, detail, post_process_key=''):
+    # node IDs are not rendered from mesh.node_ids with NODE_IDS_MD5, but including them anyway keeps the key simple
+    return _render_key(mesh, template, DOT_FILTERS, highlights, 'dot', node_ids, detail, post_process_key)
+
+
+class DiskRenderCache(object):
+    """Content-addressed cache of rendered meshes, held as files in a directory.
+
+    Entries are keyed by a digest of everything the output depends on: the mesh fingerprint (see Mesh.fingerprint()),
+    the template text and filters, the highlight overlay and the render options. Unchanged meshes are therefore read
+    back from disk instead of being rendered again, across runs and processes.
+
+    Entries are written to a temporary file and atomically renamed into place, so several processes can share a cache
+    directory and readers never see a partial entry. The total size of the entries is kept within a budget by evicting
+    the least recently used ones, based on file modification times which are refreshed on every hit.
+    """
+
+    SUFFIX = '.render'
+    TEMP_PREFIX = '.tmp-'
+    # temporary files older than this (in seconds) are left over from interrupted writes, and are removed on eviction
+    STALE_TEMP_AGE = 3600
+
+    def __init__(self, directory, max_bytes=256 << 20):
+        """Instantiates a cache using the given directory, which is created if necessary.
+
+        :param str directory: directory holding the cache entries, which may be shared with other processes
+        :param int max_bytes: budget for the total size of the entries
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        # entries written by other processes are only accounted for on the next scan of the directory
+        self._size = self._scan()[1]
+
+    key = staticmethod(_digest_key)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        """Returns the entry for the given key, marking it as recently used, or None if there is no such entry.
+
+        :param str key: cache key, see key()
+        :returns: the cached text or bytes, as they were stored
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass  # evicted by another process since it was read
+        with self._lock:
+            self.hits += 1
+        return data[1:].decode('utf-8') if data[:1] == _TEXT else data[1:]
+
+    def put(self, key, value):
+        """Stores an entry, then evicts the least recently used entries if the cache is over its size budget.
+
+        :param str key: cache key, see key()
+        :param value: text or bytes to store
+        """
+        data = (_BYTES + value) if isinstance(value, bytes) else (_TEXT + value.encode('utf-8'))
+        fd, temp_path = tempfile.mkstemp(prefix=self.TEMP_PREFIX, dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self._rename(temp_path, self._path(key))
+        except BaseException:
+            self._remove(temp_path)
+            raise
+
+        with self._lock:
+            self._size += len(data)
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    @staticmethod
+    def _rename(source, destination):
+        try:
+            os.rename(source, destination)
+        except OSError:
+            # renaming over an existing file fails on Windows. The existing entry has the same key and so the same
+            # content, having been written by another process, so it can be kept instead
+            if not os.path.exists(destination):
+                raise
+            os.remove(source)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def _scan(self):
+        """Returns a list of (modification time, size, path) for every entry, and their total size.
+        """
+        entries = []
+        total = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # removed by another process
+            if name.endswith(self.SUFFIX):
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            elif name.startswith(self.TEMP_PREFIX) and now - stat.st_mtime > self.STALE_TEMP_AGE:
+                self._remove(path)
+        return entries, total
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is within its size budget.
+        """
+        entries, total = self._scan()
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+        with self._lock:
+            self._size = total
+
+    def clear(self):
+        """Removes every entry and resets the hit/miss counters.
+        """
+        for _, _, path in self._scan()[0]:
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Returns a CacheInfo tuple of (hits, misses, maxsize, currsize), with the sizes in bytes.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.max_bytes, self._size)
+
+    def render_mesh_as_dot(self, mesh, template=DOT_TEMPLATE, node_ids=NODE_IDS_COMPACT, highlights=None,
+                           detail=DETAIL_FULL, post_process=None, post_process_key=None):
+        """Renders the given mesh in the Graphviz dot format through the cache, see hexaviz.render_mesh_as_dot().
+
+        :param Mesh mesh: the mesh to be rendered
+        :param str template: alternative template to use
+        :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5
+        :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+        :param str detail: DETAIL_FULL (default), DETAIL_COMPONENTS or DETAIL_OVERVIEW
+        :param post_process: optional callable applied to the dot output (e.g. running Graphviz), whose result, text
+                             or bytes, is cached instead of the dot output
+        :param str post_process_key: identifies the post-processing (e.g. the Graphviz command line) in the cache key.
+                                     Required, and not empty, with post_process
+        :returns: the dot representation of the mesh, or the result of post_process
+        """
+        if post_process is not None and not post_process_key:
+            raise ValueError('post_process_key is required to cache the result of post_process')
+
+        key = _dot_render_key(mesh, template, node_ids, highlights, detail, post_process_key or '')
+        value = self.get(key)
+        if value is None:
+            value = render_mesh_as_dot(mesh, template, node_ids=node_ids, highlights=highlights, detail=detail)
+            if post_process is not None:
+                value = post_process(value)
+            self.put(key, value)
+        return value
+
+
+RenderCacheInfo = namedtuple('RenderCacheInfo', ['hits', 'misses', 'coalesced', 'evictions', 'expirations',
+                                                 'maxsize', 'currsize', 'entries'])
+
+
+class _PendingRender(object):
+    """A render in progress, which concurrent identical requests wait for instead of rendering again."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class MemoryRenderCache(object):
+    """In-process cache of rendered meshes for long-running services, bounded by the memory used by the renders.
+
+    Entries are keyed like those of DiskRenderCache, evicted least recently used first once the total size of the
+    entries exceeds the budget, and optionally expire after a time to live. The cache is safe to use from several
+    threads, and coalesces concurrent identical requests: while an entry is being rendered, other requests for it wait
+    for that render rather than starting their own.
+    """
+
+    key = staticmethod(_digest_key)
+
+    def __init__(self, max_bytes=64 << 20, ttl=None, clock=time.time):
+        """Instantiates an empty cache.
+
+        :param int max_bytes: budget for the total size of the entries, as measured by sys.getsizeof()
+        :param float ttl: default time to live of the entries in seconds, or None for no expiry
+        :param clock: function returning the current time in seconds
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, expiry time or None), least recently used first
+        self._pending = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_render(self, key, render_function, ttl=None):
+        """Returns the entry for the given key, calling render_function to produce and store it if there is none.
+
+        If another thread is already rendering the entry, this waits for that render instead, and re-raises its
+        exception if it fails.
+
+        :param key: hashable cache key, see key()
+        :param render_function: function taking no arguments which returns the text or bytes to cache
+        :param float ttl: time to live of a new entry in seconds, defaulting to the ttl of the cache
+        :returns: the cached or rendered value
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                value, size, expiry = entry
+                if expiry is None or expiry > self._clock():
+                    self._entries[key] = entry  # re-insert as most recently used
+                    self.hits += 1
+                    return value
+                self._size -= size
+                self.expirations += 1
+
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _PendingRender()
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = render_function()
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if pending.error is None:
+                    self._store(key, pending.value, self.ttl if ttl is None else ttl)
+            pending.done.set()
+        return pending.value
+
+    def _store(self, key, value, ttl):
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value, size, None if ttl is None else self._clock() + ttl
+        self._size += size
+        while self._size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+
+    def render_mesh_as_dot(self, mesh, template=DOT_TEMPLATE, node_ids=NODE_IDS_COMPACT, highlights=None,
+                           detail=DETAIL_FULL, ttl=None):
+        """Renders the given mesh in the Graphviz dot format through the cache, see hexaviz.render_mesh_as_dot().
+
+        :param Mesh mesh: the mesh to be rendered
+        :param str template: alternative template to use
+        :param str node_ids: NODE_IDS_COMPACT (default) or NODE_IDS_MD5
+        :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+        :param str detail: DETAIL_FULL (default), DETAIL_COMPONENTS or DETAIL_OVERVIEW
+        :param float ttl: time to live of a new entry in seconds, defaulting to the ttl of the cache
+        :returns: textual dot representation of the mesh
+        """
+        return self.get_or_render(
+            _dot_render_key(mesh, template, node_ids, highlights, detail),
+            lambda: render_mesh_as_dot(mesh, template, node_ids=node_ids, highlights=highlights, detail=detail),
+            ttl)
+
+    def render(self, mesh, template, custom_filters=None, highlights=None, ttl=None):
+        """Renders the given mesh using the template text provided through the cache, see hexaviz.render().
+
+        :param Mesh mesh: the mesh to be rendered
+        :param str template: the template text to be used for rendering
+        :param dict custom_filters: dict of custom filters where the key is the filter tag and the value is the callables
+        :param HighlightSet highlights: additional elements to render as highlighted, without modifying the mesh
+        :param float ttl: time to live of a new entry in seconds, defaulting to the ttl of the cache
+        :returns: rendered textual representation of the mesh
+        """
+        key = _render_key(mesh, template, custom_filters, highlights, 'render')
+        if custom_filters:
+            # the digest only identifies the filters by name, so also key on the callables themselves (as TemplateCache
+            # does) to tell apart lambdas and closures of the same name
+            key = key, frozenset(custom_filters.items())
+        return self.get_or_render(key, lambda: render(mesh, template, custom_filters, highlights=highlights), ttl)
+
+    def clear(self):
+        """Discards every entry and resets the statistics. Renders in progress are not affected.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.coalesced = self.evictions = self.expirations = 0
+
+    def info(self):
+        """Returns a RenderCacheInfo tuple of statistics, with the sizes in bytes.
+        """
+        with self._lock:
+            return RenderCacheInfo(self.hits, self.misses, self.coalesced, self.evictions, self.expirations,
+                                   self.max_bytes, self._size, len(self._entries))
@@ -0,0 +1,184 @@
+"""
+Columnar store of the connections of a mesh, for meshes with millions of connections.
+
+Example usage:
+
+        # Keep the connections in parallel arrays of integer IDs rather than one object per connection
+        m = Mesh(columnar=True)
+
+        # The Mesh API and as_dict() are unchanged, and the columns can be scanned directly, e.g. with NumPy
+        store = m.connections
+        fan_in = numpy.bincount(numpy.frombuffer(store.producer_labels, dtype=numpy.int32))
+        busiest = store.names[fan_in.argmax()]
+"""
+from array import array
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from hexaviz import Mesh, ResourceConnectionNode
+
+# typecode of the ID columns, which is 32 bits on every platform (unlike 'l')
+_ID_TYPECODE = 'i'
+
+
+def _consumer_key(label_id, port_id):
+    return label_id << 32 | port_id
+
+
+class ColumnarConnections(Mapping):
+    """Read-only mapping of connection keys to connections, with the same keys, in the same order, as the dict
+    normally used for Mesh.connections, holding the connections in parallel arrays instead.
+
+    Each connection is a row of the arrays:
+
+        consumer_labels, consumer_ports   IDs of the consumer label and needs port
+        producer_labels, producer_ports   IDs of the producer label and provides port, or of the resource and -1
+        kinds                             index of the connection class in Mesh._CONNECTION_CLASSES
+        highlighted                       1 if the connection is highlighted, else 0
+
+    IDs index the symbol table of the mesh (see NodeIds), given as names. The arrays support the buffer protocol, so
+    analytics can scan them without copying, e.g. with numpy.frombuffer(). A hash index of the consumers, which are
+    unique, detects duplicate connections.
+
+    The connections returned by lookups and iteration are built on demand, so modifying them does not modify the
+    mesh. Use the Mesh API instead.
+    """
+
+    def __init__(self, node_ids):
+        """Instantiates an empty store.
+
+        :param NodeIds node_ids: symbol table of the mesh, which allocates the IDs
+        """
+        self._node_ids = node_ids
+        self.names = node_ids._names
+        self.consumer_labels = array(_ID_TYPECODE)
+        self.consumer_ports = array(_ID_TYPECODE)
+        self.producer_labels = array(_ID_TYPECODE)
+        self.producer_ports = array(_ID_TYPECODE)
+        self.kinds = array('b')
+        self.highlighted = array('b')
+        # packed consumer label and port IDs -> row
+        self._rows = {}
+        self.consumers = _ColumnarConsumers(self)
+
+    def add_all(self, pending, connection_class):
+        """Appends a row for each of the given connections, which must be valid and not connected yet.
+
+        :param pending: list of (consumer, producer) connection keys
+        :param connection_class: class of the connections, one of Mesh._CONNECTION_CLASSES
+        """
+        index = self._node_ids.index
+        rows = self._rows
+        kind = Mesh._CONNECTION_CLASSES.index(connection_class)
+        row = len(self.kinds)
+        for (consumer_label, consumer_port), producer in pending:
+            label_id, port_id = index(consumer_label), index(consumer_port)
+            self.consumer_labels.append(label_id)
+            self.consumer_ports.append(port_id)
+            if connection_class is ResourceConnectionNode:
+                self.producer_labels.append(index(producer))
+                self.producer_ports.append(-1)
+            else:
+                self.producer_labels.append(index(producer[0]))
+                self.producer_ports.append(index(producer[1]))
+            rows[_consumer_key(label_id, port_id)] = row
+            row += 1
+        self.kinds.extend([kind] * len(pending))
+        self.highlighted.extend([0] * len(pending))
+
+    def row_of(self, consumer):
+        """Returns the row of the connection of the given (label, needs port), or None if it is not connected."""
+        try:
+            label, port = consumer
+        except (TypeError, ValueError):
+            return None
+        ids = self._node_ids._ids
+        label_id, port_id = ids.get(label), ids.get(port)
+        if label_id is None or port_id is None:
+            return None
+        return self._rows.get(_consumer_key(label_id, port_id))
+
+    def _producer(self, row):
+        names = self.names
+        port_id = self.producer_ports[row]
+        if port_id < 0:
+            return names[self.producer_labels[row]]
+        return names[self.producer_labels[row]], names[port_id]
+
+    def _row_of_key(self, key):
+        try:
+            consumer, producer = key
+        except (TypeError, ValueError):
+            return None
+        row = self.row_of(consumer)
+        if row is None or self._producer(row) != producer:
+            return None
+        return row
+
+    def _connection(self, row, consumer, producer):
+        connection = Mesh._CONNECTION_CLASSES[self.kinds[row]](consumer, producer)
+        connection.highlighted = bool(self.highlighted[row])
+        return connection
+
+    def highlight(self, key):
+        """Highlights the connection of the given key.
+
+        :raises: KeyError if there is no such connection
+        """
+        row = self._row_of_key(key)
+        if row is None:
+            raise KeyError(key)
+        self.highlighted[row] = 1
+
+    def __getitem__(self, key):
+        row = self._row_of_key(key)
+        if row is None:
+            raise KeyError(key)
+        return self._connection(row, *key)
+
+    def __contains__(self, key):
+        return self._row_of_key(key) is not None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        for key, _ in self._iter_rows():
+            yield key
+
+    def _iter_rows(self):
+        names = self.names
+        for row, (consumer_label, consumer_port, producer_label, producer_port) in enumerate(zip(
+                self.consumer_labels, self.consumer_ports, self.producer_labels, self.producer_ports)):
+            producer = (names[producer_label] if producer_port < 0
+                        else (names[producer_label], names[producer_port]))
+            yield ((names[consumer_label], names[consumer_port]), producer), row
+
+    def items(self):
+        for key, row in self._iter_rows():
+            yield key, self._connection(row, *key)
+
+    def values(self):
+        for key, row in self._iter_rows():
+            yield self._connection(row, *key)
+
+
+class _ColumnarConsumers(object):
+    """Set-like view of the connected (label, needs port) consumers of a ColumnarConnections, used as
+    Mesh.connected_consumers.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def __contains__(self, consumer):
+        return self._store.row_of(consumer) is not None
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        for consumer, _ in self._store:
+            yield consumer
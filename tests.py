@@ -18,19 +18,51 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import gc
 import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
+import weakref
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 from hexaviz import (
+    DOT_FILTERS,
+    DOT_TEMPLATE,
+    DETAIL_COMPONENTS,
+    DETAIL_FULL,
+    DETAIL_OVERVIEW,
+    DiskRenderCache,
+    NODE_IDS_COMPACT,
+    NODE_IDS_MD5,
+    HighlightSet,
+    MemoryRenderCache,
     Mesh,
+    RenderStats,
+    TemplateCache,
     render,
+    render_iter,
+    render_to,
     render_mesh_as_dot,
+    render_many,
+    write_mesh_as_dot,
+    clear_template_cache,
+    template_cache_info,
     DuplicateEntry,
     InvalidComponent,
     InvalidPort,
     InvalidDomain,
     InvalidConnection,
     InvalidResource,
+    InvalidBatch,
 )
 
 
@@ -513,6 +545,59 @@ class MeshTest(unittest.TestCase):
         # THEN an InvalidConnection exception is raised
         self.assertRaises(InvalidConnection, m.add_connection, 'A', 'n1', 'D', 'pX')
 
+    def test_consumers_of_a_component_can_be_retrieved(self):
+        # GIVEN a Mesh where several components consume the ports of B
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2'])
+        m.add_component('B', provides_ports=['p1', 'p2'])
+        m.add_component('C', needs_ports=['nX'])
+        m.add_connection('A', 'n1', 'B', 'p1')
+        m.add_connection('C', 'nX', 'B', 'p2')
+        m.add_connection('A', 'n2', 'B', 'p1')
+
+        # WHEN we request the consumers of B, optionally restricted to a port
+        # THEN the connected needs ports are returned in the order they were connected
+        self.assertEqual([('A', 'n1'), ('C', 'nX'), ('A', 'n2')], m.consumers_of('B'))
+        self.assertEqual([('A', 'n1'), ('A', 'n2')], m.consumers_of('B', 'p1'))
+        self.assertEqual([('C', 'nX')], m.consumers_of('B', 'p2'))
+        self.assertEqual([], m.consumers_of('A'))
+
+    def test_dependencies_of_a_component_can_be_retrieved(self):
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2', 'n3'])
+        m.add_component('B', provides_ports=['p1', 'p2'])
+        m.add_resource('Resource X')
+        m.add_connection('A', 'n2', 'B', 'p2')
+        m.add_connection_to_resource('A', 'n3', 'Resource X')
+        m.add_connection('A', 'n1', 'B', 'p1')
+
+        self.assertEqual([('B', 'p2'), 'Resource X', ('B', 'p1')], m.dependencies_of('A'))
+        self.assertEqual([], m.dependencies_of('B'))
+
+    def test_adjacency_of_domains_uses_the_domain_ports(self):
+        m = Mesh()
+        m.add_domain('D')
+        m.add_component('A', needs_ports=['n1'], provides_ports=['p1'])
+        m.add_component('B', needs_ports=['n1'])
+        m.add_component('C', provides_ports=['p1'])
+        m.add_component_to_domain('A', 'D')
+        m.expose_component_needs_port('A', 'n1')
+        m.expose_component_provides_port('A', 'p1')
+        m.add_connection('B', 'n1', 'D', 'p1')
+        m.add_connection('D', 'n1', 'C', 'p1')
+
+        self.assertEqual([('B', 'n1')], m.consumers_of('D'))
+        self.assertEqual([('C', 'p1')], m.dependencies_of('D'))
+        self.assertEqual([('D__provides', 'p1')], m.consumers_of('A', 'p1'))
+        self.assertEqual([('D__needs', 'n1')], m.dependencies_of('A'))
+
+    def test_InvalidComponent_or_InvalidPort_raised_when_requesting_adjacency_of_unknown_elements(self):
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        self.assertRaises(InvalidComponent, m.consumers_of, 'X')
+        self.assertRaises(InvalidComponent, m.dependencies_of, 'X')
+        self.assertRaises(InvalidPort, m.consumers_of, 'A', 'n1')
+
     def test_added_resource_can_be_retrieved_from_mesh(self):
         # GIVEN a new Mesh instance
         m = Mesh()
@@ -593,6 +678,29 @@ class MeshTest(unittest.TestCase):
             ],
         }, m.as_dict())
 
+    def test_consumers_of_a_resource_can_be_retrieved(self):
+        # GIVEN a Mesh with several ports connected to resources
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2'])
+        m.add_component('B', needs_ports=['n1'])
+        m.add_resource('Resource X')
+        m.add_resource('Resource Y')
+        m.add_resource('Resource Z')
+        m.add_connection_to_resource('B', 'n1', 'Resource X')
+        m.add_connection_to_resource('A', 'n2', 'Resource Y')
+        m.add_connection_to_resource('A', 'n1', 'Resource X')
+
+        # WHEN we request the consumers of each resource
+        # THEN the connected ports are returned in the order they were connected
+        self.assertEqual([('B', 'n1'), ('A', 'n1')], m.consumers_of_resource('Resource X'))
+        self.assertEqual([('A', 'n2')], m.consumers_of_resource('Resource Y'))
+        self.assertEqual([], m.consumers_of_resource('Resource Z'))
+
+    def test_InvalidResource_exception_raised_when_requesting_consumers_of_unknown_resource(self):
+        m = Mesh()
+        m.add_resource('Resource X')
+        self.assertRaises(InvalidResource, m.consumers_of_resource, 'Resource K')
+
     def test_InvalidComponent_exception_raised_when_creating_connections_to_resource_with_invalid_consumer_component(self):
         # GIVEN a mesh with the following component and resource
         #
@@ -950,6 +1058,475 @@ class MeshTest(unittest.TestCase):
         # THEN an InvalidResource exception is raised
         self.assertRaises(InvalidResource, m.highlight_resource, 'Resource K')
 
+    def test_highlight_sets_are_overlaid_without_modifying_the_mesh(self):
+        # GIVEN a mesh with the following components and resource, where B is highlighted on the mesh itself
+        #
+        #     _____________           _____________
+        #    |      A      |         |      B      |
+        #    |-------------|         |-------------|
+        #    |      |  n1  |-------->|  p1  |  n2  |--------->[ Resource X ]
+        #    |______|______|         |______|______|
+        #
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        m.add_component('B', needs_ports=['n2'], provides_ports=['p1'])
+        m.add_resource('Resource X')
+        m.add_connection('A', 'n1', 'B', 'p1')
+        m.add_connection_to_resource('B', 'n2', 'Resource X')
+        m.highlight_component('B')
+        before = m.as_dict()
+        version = m.version
+
+        # WHEN two different highlight sets are applied to it
+        first = HighlightSet(m).highlight_component('A').highlight_connection('A', 'n1', 'B', 'p1')
+        second = HighlightSet(m).highlight_connection_to_resource('B', 'n2', 'Resource X')
+        second.highlight_resource('Resource X')
+
+        # THEN each is rendered as if the mesh was highlighted, and the mesh itself is left untouched
+        self.assertEqual({
+            'components': [
+                {'name': 'A', 'needs_ports': ['n1'], 'provides_ports': [], 'highlighted': True},
+                {'name': 'B', 'needs_ports': ['n2'], 'provides_ports': ['p1'], 'highlighted': True},
+            ],
+            'domains': [],
+            'resources': ['Resource X'],
+            'connections': [{
+                'consumer_component': 'A',
+                'consumer_port': 'n1',
+                'producer_component': 'B',
+                'producer_port': 'p1',
+                'highlighted': True,
+            }, {
+                'consumer_component': 'B',
+                'consumer_port': 'n2',
+                'resource': 'Resource X',
+            }],
+        }, first.as_dict(m))
+        self.assertEqual({
+            'components': [
+                {'name': 'A', 'needs_ports': ['n1'], 'provides_ports': []},
+                {'name': 'B', 'needs_ports': ['n2'], 'provides_ports': ['p1'], 'highlighted': True},
+            ],
+            'domains': [],
+            'resources': ['Resource X'],
+            'highlighted_resources': ['Resource X'],
+            'connections': [{
+                'consumer_component': 'A',
+                'consumer_port': 'n1',
+                'producer_component': 'B',
+                'producer_port': 'p1',
+            }, {
+                'consumer_component': 'B',
+                'consumer_port': 'n2',
+                'resource': 'Resource X',
+                'highlighted': True,
+            }],
+        }, second.as_dict(m))
+        self.assertEqual(before, m.as_dict())
+        self.assertEqual(version, m.version)
+
+    def test_highlight_sets_reject_unknown_elements(self):
+        # GIVEN a mesh with a single connection to a resource
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        m.add_resource('Resource X')
+        m.add_connection_to_resource('A', 'n1', 'Resource X')
+        highlights = HighlightSet(m)
+
+        # WHEN unknown elements are added to a highlight set
+        # THEN the same exceptions are raised as when highlighting them on the mesh
+        self.assertRaises(InvalidComponent, highlights.highlight_component, 'B')
+        self.assertRaises(InvalidConnection, highlights.highlight_connection, 'A', 'n1', 'B', 'p1')
+        self.assertRaises(InvalidConnection, highlights.highlight_connection_to_resource, 'A', 'n2', 'Resource X')
+        self.assertRaises(InvalidResource, highlights.highlight_resource, 'Resource K')
+
+    @staticmethod
+    def _build_mesh_with_dependency_chain_through_domain():
+        #     _____________         _____________         ___________________________
+        #    |      B      |       |      A      |       |  Dom   _____________     |
+        #    |-------------|       |-------------|       |       |      X      |    |
+        #    |      |  b   |------>|  pa  |  n1  |------>|[p]--->|  p   |  x   |--->[x]------->[ Resource R ]
+        #    |______|______|       |______|______|       |       |______|______|    |
+        #                                                |__________________________|
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'], provides_ports=['pa'])
+        m.add_component('B', needs_ports=['b'])
+        m.add_component('X', needs_ports=['x'], provides_ports=['p'])
+        m.add_resource('Resource R')
+        m.add_domain('Dom')
+        m.add_component_to_domain('X', 'Dom')
+        m.expose_component_provides_port('X', 'p')
+        m.expose_component_needs_port('X', 'x')
+        m.add_connection('B', 'b', 'A', 'pa')
+        m.add_connection('A', 'n1', 'Dom', 'p')
+        m.add_connection_to_resource('Dom', 'x', 'Resource R')
+        return m
+
+    def test_connections_can_be_traversed_upstream_and_downstream_through_domains(self):
+        # GIVEN a mesh where B transitively depends on Resource R through the ports exposed by a domain
+        m = self._build_mesh_with_dependency_chain_through_domain()
+        b_to_a = ('B', 'b'), ('A', 'pa')
+        a_to_dom = ('A', 'n1'), ('Dom__provides', 'p')
+        dom_to_x = ('Dom__provides', 'p'), ('X', 'p')
+        x_to_dom = ('X', 'x'), ('Dom__needs', 'x')
+        dom_to_r = ('Dom__needs', 'x'), 'Resource R'
+
+        # WHEN the connections are traversed
+        # THEN they are reached in breadth first order, following the domain labels
+        self.assertEqual([b_to_a, a_to_dom, dom_to_x, x_to_dom, dom_to_r], m.upstream_of('B'))
+        self.assertEqual([a_to_dom, dom_to_x], m.upstream_of('A', hops=2))
+        self.assertEqual([dom_to_r, x_to_dom, dom_to_x, a_to_dom, b_to_a], m.downstream_of('Resource R'))
+        self.assertEqual([dom_to_r, x_to_dom], m.downstream_of('Resource R', hops=2))
+        self.assertEqual([], m.upstream_of('Resource R'))
+        self.assertEqual([a_to_dom, b_to_a], m.neighbourhood_of('A'))
+        self.assertEqual([dom_to_r, dom_to_x, x_to_dom, a_to_dom], m.neighbourhood_of('Dom'))
+        self.assertRaises(InvalidComponent, m.upstream_of, 'K')
+
+    def test_shortest_path_between_elements(self):
+        # GIVEN a mesh where B transitively depends on Resource R through the ports exposed by a domain
+        m = self._build_mesh_with_dependency_chain_through_domain()
+
+        # WHEN shortest paths are looked up
+        # THEN they list the connections from the source to the target, if the source depends on the target
+        self.assertEqual([
+            (('B', 'b'), ('A', 'pa')),
+            (('A', 'n1'), ('Dom__provides', 'p')),
+            (('Dom__provides', 'p'), ('X', 'p')),
+            (('X', 'x'), ('Dom__needs', 'x')),
+            (('Dom__needs', 'x'), 'Resource R'),
+        ], m.shortest_path('B', 'Resource R'))
+        self.assertEqual([(('A', 'n1'), ('Dom__provides', 'p'))], m.shortest_path('A', 'Dom'))
+        self.assertEqual([], m.shortest_path('A', 'A'))
+        self.assertEqual([], m.shortest_path('Resource R', 'Resource R'))
+        self.assertEqual(None, m.shortest_path('X', 'B'))
+        self.assertRaises(InvalidComponent, m.shortest_path, 'A', 'K')
+        self.assertRaises(InvalidComponent, m.shortest_path, 'K', 'A')
+
+    @staticmethod
+    def _build_mesh_with_domain_exposing_two_needs_ports():
+        #     ___________________________
+        #    |  Dom    _____________     |
+        #    |        |      A      |    |
+        #    |        |      |  n1  |--->[n1]------->[ X ]
+        #    |        |______|______|    |
+        #    |         _____________     |
+        #    |        |      B      |    |
+        #    |        |      |  n2  |--->[n2]------->[ Y ]
+        #    |        |______|______|    |
+        #    |___________________________|
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        m.add_component('B', needs_ports=['n2'])
+        m.add_component('X', provides_ports=['p'])
+        m.add_component('Y', provides_ports=['p'])
+        m.add_domain('Dom')
+        m.add_component_to_domain('A', 'Dom')
+        m.add_component_to_domain('B', 'Dom')
+        m.expose_component_needs_port('A', 'n1')
+        m.expose_component_needs_port('B', 'n2')
+        m.add_connection('Dom', 'n1', 'X', 'p')
+        m.add_connection('Dom', 'n2', 'Y', 'p')
+        return m
+
+    def test_traversals_through_a_domain_only_follow_the_port_they_reached_it_by(self):
+        # GIVEN a domain exposing a needs port of A connected to X, and a needs port of B connected to Y
+        m = self._build_mesh_with_domain_exposing_two_needs_ports()
+        a_to_dom = ('A', 'n1'), ('Dom__needs', 'n1')
+        b_to_dom = ('B', 'n2'), ('Dom__needs', 'n2')
+        dom_to_x = ('Dom__needs', 'n1'), ('X', 'p')
+        dom_to_y = ('Dom__needs', 'n2'), ('Y', 'p')
+
+        # WHEN the connections of A and Y are traversed
+        # THEN A only depends on X, and only B depends on Y
+        self.assertEqual([a_to_dom, dom_to_x], m.upstream_of('A'))
+        self.assertEqual([dom_to_y, b_to_dom], m.downstream_of('Y'))
+        self.assertEqual([a_to_dom, dom_to_x], m.shortest_path('A', 'X'))
+        self.assertEqual(None, m.shortest_path('A', 'Y'))
+        self.assertEqual([dom_to_x, dom_to_y], m.upstream_of('Dom'))
+
+    def test_connections_can_be_highlighted_in_bulk(self):
+        # GIVEN a mesh where B transitively depends on Resource R through the ports exposed by a domain
+        m = self._build_mesh_with_dependency_chain_through_domain()
+        version = m.version
+
+        # WHEN the blast radius of A is highlighted on the mesh, and its dependencies in a highlight set
+        m.highlight_connections(m.downstream_of('A'))
+        highlights = HighlightSet(m).highlight_connections(m.upstream_of('A'))
+
+        # THEN exactly those connections are highlighted, with a single modification of the mesh
+        self.assertEqual(version + 1, m.version)
+        self.assertEqual([False, False, True, False, False], [c.get('highlighted', False)
+                                                              for c in m.as_dict()['connections']])
+        self.assertEqual([True, True, True, True, True], [c.get('highlighted', False)
+                                                          for c in highlights.as_dict(m)['connections']])
+        self.assertRaises(InvalidBatch, m.highlight_connections, [(('A', 'n1'), ('B', 'b'))])
+        self.assertRaises(InvalidBatch, highlights.highlight_connections, [(('A', 'n1'), ('B', 'b'))])
+
+    def test_fingerprint_depends_on_the_structure_of_the_mesh_only(self):
+        # GIVEN two meshes with the same elements added in a different order across sections
+        a = Mesh()
+        a.add_component('A', needs_ports=['n1'])
+        a.add_resource('R')
+        a.add_component('B', provides_ports=['p1'])
+        b = Mesh()
+        b.add_resource('R')
+        b.add_components([{'name': 'A', 'needs_ports': ['n1']}, {'name': 'B', 'provides_ports': ['p1']}])
+
+        # WHEN their fingerprints are taken, including after further changes
+        # THEN they are the same while their elements are, and differ by the sections that changed
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+        before = a.fingerprint()
+        a.add_connection('A', 'n1', 'B', 'p1')
+        self.assertEqual(['connections'], a.fingerprint().changed_sections(before))
+        self.assertNotEqual(before.digest, a.fingerprint().digest)
+        b.add_connection('A', 'n1', 'B', 'p1')
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+        a.highlight_component('A')
+        a.highlight_resource('R')
+        self.assertEqual(['components', 'highlighted_resources'], a.fingerprint().changed_sections(b.fingerprint()))
+
+        # AND the order of elements within a section matters
+        c = Mesh()
+        c.add_component('B', provides_ports=['p1'])
+        c.add_component('A', needs_ports=['n1'])
+        c.add_resource('R')
+        c.add_connection('A', 'n1', 'B', 'p1')
+        self.assertEqual(['components'], c.fingerprint().changed_sections(b.fingerprint()))
+
+    def test_fingerprint_is_maintained_incrementally(self):
+        # GIVEN a mesh whose fingerprint is taken after each change to it
+        m = Mesh()
+        m.fingerprint()
+        m.add_component('A', needs_ports=['n1'])
+        m.fingerprint()
+        m.add_component('B', provides_ports=['p1'])
+        m.add_needs_port('A', 'n2')
+        m.add_resource('Resource X')
+        m.add_connection('A', 'n1', 'B', 'p1')
+        m.fingerprint()
+        m.add_connection_to_resource('A', 'n2', 'Resource X')
+        m.add_domain('Dom')
+        m.add_component_to_domain('B', 'Dom')
+        m.expose_component_provides_port('B', 'p1')
+        m.highlight_connection('A', 'n1', 'B', 'p1')
+        m.fingerprint()
+        m.highlight_resource('Resource X')
+
+        # WHEN it is compared with the fingerprint of a copy of the mesh, which is computed from scratch
+        copy = pickle.loads(pickle.dumps(m, pickle.HIGHEST_PROTOCOL))
+
+        # THEN they are the same
+        self.assertEqual(copy.fingerprint(), m.fingerprint())
+        self.assertTrue(m.fingerprint() is m.fingerprint())
+
+    def test_subgraph_extracts_the_neighbourhood_of_elements(self):
+        # GIVEN a mesh where B transitively depends on Resource R through the ports exposed by a domain
+        m = self._build_mesh_with_dependency_chain_through_domain()
+        m.highlight_component('A')
+        m.highlight_resource('Resource R')
+
+        # WHEN the neighbourhoods of B and of Resource R are extracted
+        near_b = m.subgraph(['B'], depth=2)
+        near_r = m.subgraph(['Resource R'], depth=2)
+
+        # THEN they contain the elements within reach and the connections between them, keeping domain ports
+        self.assertEqual({
+            'components': [
+                {'name': 'B', 'needs_ports': ['b'], 'provides_ports': []},
+                {'name': 'A', 'needs_ports': ['n1'], 'provides_ports': ['pa'], 'highlighted': True},
+            ],
+            'domains': [{
+                'name': 'Dom',
+                'label_for_needs': 'Dom__needs',
+                'label_for_provides': 'Dom__provides',
+                'needs_ports': ['x'],
+                'provides_ports': ['p'],
+                'children': [],
+            }],
+            'resources': [],
+            'connections': [{
+                'consumer_component': 'B',
+                'consumer_port': 'b',
+                'producer_component': 'A',
+                'producer_port': 'pa',
+            }, {
+                'consumer_component': 'A',
+                'consumer_port': 'n1',
+                'producer_component': 'Dom__provides',
+                'producer_port': 'p',
+            }],
+        }, near_b.as_dict())
+        self.assertEqual({
+            'components': [{'name': 'X', 'needs_ports': ['x'], 'provides_ports': ['p']}],
+            'domains': [{
+                'name': 'Dom',
+                'label_for_needs': 'Dom__needs',
+                'label_for_provides': 'Dom__provides',
+                'needs_ports': ['x'],
+                'provides_ports': ['p'],
+                'children': ['X'],
+            }],
+            'resources': ['Resource R'],
+            'highlighted_resources': ['Resource R'],
+            'connections': [{
+                'consumer_component': 'Dom__needs',
+                'consumer_port': 'x',
+                'resource': 'Resource R',
+            }, {
+                'consumer_component': 'Dom__provides',
+                'consumer_port': 'p',
+                'domain_export': 'provides',
+                'producer_component': 'X',
+                'producer_port': 'p',
+            }, {
+                'consumer_component': 'X',
+                'consumer_port': 'x',
+                'domain_export': 'needs',
+                'producer_component': 'Dom__needs',
+                'producer_port': 'x',
+            }],
+        }, near_r.as_dict())
+        self.assertEqual(5, len(m.subgraph(['A', 'X'], depth=5).connections))
+        self.assertRaises(InvalidComponent, m.subgraph, ['K'])
+
+    def test_subgraph_only_follows_the_domain_port_an_element_is_connected_through(self):
+        # GIVEN a domain exposing a needs port of A connected to X, and a needs port of B connected to Y
+        m = self._build_mesh_with_domain_exposing_two_needs_ports()
+
+        # WHEN the neighbourhood of A is extracted
+        near_a = m.subgraph(['A'], depth=2)
+
+        # THEN it holds X, reached through the port of A, but not B or Y, reached through the other port
+        self.assertEqual(['A', 'Dom', 'X'], list(near_a.components))
+        self.assertEqual([
+            (('A', 'n1'), ('Dom__needs', 'n1')),
+            (('Dom__needs', 'n1'), ('X', 'p')),
+        ], list(near_a.connections))
+        self.assertEqual(['A'], list(near_a.components['Dom'].children))
+
+    def test_mesh_can_be_built_in_bulk(self):
+        # GIVEN a mesh built one element at a time
+        expected = Mesh()
+        expected.add_component('A', needs_ports=['n1', 'n2'])
+        expected.add_component('B', provides_ports=['p1', 'p2'])
+        expected.add_component('C', needs_ports=['nX'])
+        expected.add_resource('Resource X')
+        expected.add_connection('A', 'n1', 'B', 'p1')
+        expected.add_connection('C', 'nX', 'B', 'p2')
+        expected.add_connection_to_resource('A', 'n2', 'Resource X')
+
+        # WHEN the same mesh is built using the bulk entry points
+        m = Mesh.from_records(
+            components=[
+                {'name': 'A', 'needs_ports': ['n1', 'n2']},
+                {'name': 'B', 'provides_ports': ['p1', 'p2']},
+                {'name': 'C', 'needs_ports': ['nX']},
+            ],
+            resources=['Resource X'],
+            connections=[('A', 'n1', 'B', 'p1'), ('C', 'nX', 'B', 'p2')],
+            resource_connections=[('A', 'n2', 'Resource X')],
+        )
+
+        # THEN both meshes are identical
+        self.assertEqual(expected.as_dict(), m.as_dict())
+        self.assertEqual(expected.consumers_of('B'), m.consumers_of('B'))
+        self.assertEqual(expected.consumers_of_resource('Resource X'), m.consumers_of_resource('Resource X'))
+
+    def test_all_errors_in_a_batch_are_reported_and_nothing_is_added(self):
+        # GIVEN a mesh with existing components and connections
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2', 'n3'])
+        m.add_component('B', provides_ports=['p1'])
+        m.add_connection('A', 'n1', 'B', 'p1')
+        before = m.as_dict()
+
+        # WHEN a batch with several invalid connections is added
+        try:
+            m.add_connections([
+                ('A', 'n2', 'B', 'p1'),  # valid
+                ('A', 'n1', 'B', 'p1'),  # already connected
+                ('X', 'n1', 'B', 'p1'),  # unknown component
+                ('A', 'n3', 'B', 'pX'),  # unknown port
+                ('A', 'n2', 'B', 'p1'),  # connected twice within the batch
+            ])
+        except InvalidBatch as e:
+            errors = e.errors
+        else:
+            self.fail('InvalidBatch not raised')
+
+        # THEN every error is reported and the mesh is unchanged
+        self.assertEqual([InvalidConnection, InvalidComponent, InvalidPort, InvalidConnection],
+                         [type(error) for error in errors])
+        self.assertEqual(before, m.as_dict())
+
+    def test_invalid_component_and_resource_batches_are_rejected(self):
+        m = Mesh()
+        m.add_component('A')
+        m.add_resource('Resource X')
+
+        try:
+            m.add_components([{'name': 'A'}, {'name': 'B', 'needs_ports': ['n1', 'n1']}, {'name': 'B'}])
+        except InvalidBatch as e:
+            self.assertEqual(3, len(e.errors))
+        else:
+            self.fail('InvalidBatch not raised')
+        self.assertRaises(InvalidBatch, m.add_resources, ['Resource Y', 'Resource X'])
+        self.assertRaises(InvalidBatch, m.add_connections_to_resources, [('A', 'n1', 'Resource K')])
+
+        self.assertEqual(['A'], list(m.components))
+        self.assertEqual(['Resource X'], list(m.resources))
+
+    def test_version_is_incremented_when_the_mesh_is_modified(self):
+        m = Mesh()
+        versions = [m.version]
+        m.add_component('A', needs_ports=['n1'])
+        versions.append(m.version)
+        m.add_component('B', provides_ports=['p1'])
+        versions.append(m.version)
+        m.add_connection('A', 'n1', 'B', 'p1')
+        versions.append(m.version)
+        m.highlight_component('A')
+        versions.append(m.version)
+        m.as_dict()
+        versions.append(m.version)
+
+        self.assertEqual(sorted(set(versions[:-1])), versions[:-1])
+        self.assertEqual(versions[-2], versions[-1])
+
+    def test_dict_representation_is_reused_until_the_mesh_is_modified(self):
+        # GIVEN a populated mesh
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2'])
+        m.add_component('B', provides_ports=['p1'])
+        m.add_component('C', provides_ports=['p1'])
+        m.add_connection('A', 'n1', 'B', 'p1')
+        first = m.as_dict()
+
+        # WHEN it is requested again without modification
+        # THEN the same representation is returned
+        self.assertTrue(first is m.as_dict())
+
+        # WHEN a connection is added
+        m.add_connection('A', 'n2', 'C', 'p1')
+        second = m.as_dict()
+
+        # THEN the connections are rebuilt but the component representations are reused
+        self.assertFalse(first is second)
+        self.assertEqual(2, len(second['connections']))
+        self.assertTrue(first['components'] is second['components'])
+        self.assertTrue(first['connections'][0] is second['connections'][0])
+
+        # WHEN a component is highlighted
+        m.highlight_component('B')
+        third = m.as_dict()
+
+        # THEN only the representation of that component is rebuilt
+        self.assertEqual({'name': 'B', 'needs_ports': [], 'provides_ports': ['p1'], 'highlighted': True},
+                         third['components'][1])
+        self.assertTrue(second['components'][0] is third['components'][0])
+        self.assertTrue(second['components'][2] is third['components'][2])
+        self.assertTrue(second['connections'] is third['connections'])
+
     def test_adding_empty_domain(self):
         m = Mesh()
         m.add_domain('D')
@@ -1162,6 +1739,111 @@ class MeshTest(unittest.TestCase):
             }],
         }, m.as_dict())
 
+    def test_mesh_survives_pickling(self):
+        # GIVEN a mesh using every feature
+        m = DotRenderTest._build_mesh_using_all_features()
+
+        # WHEN it is pickled and unpickled
+        copy = pickle.loads(pickle.dumps(m, pickle.HIGHEST_PROTOCOL))
+
+        # THEN the copy is equivalent, renders identically, and can still be modified and queried
+        self.assertEqual(m.as_dict(), copy.as_dict())
+        self.assertEqual(m.version, copy.version)
+        self.assertEqual(render_mesh_as_dot(m), render_mesh_as_dot(copy))
+        self.assertEqual(m.consumers_of('B <x>'), copy.consumers_of('B <x>'))
+        self.assertEqual(m.consumers_of_resource('Resource X'), copy.consumers_of_resource('Resource X'))
+        self.assertRaises(InvalidConnection, copy.add_connection, 'A', 'n1', 'B <x>', 'p{2}')
+        copy.add_component('G')
+        self.assertFalse('G' in m.components)
+
+    def test_columnar_meshes_behave_like_default_meshes(self):
+        # GIVEN the same mesh built with the default and the columnar connection store
+        m = DotRenderTest._build_mesh_using_all_features()
+        columnar = DotRenderTest._build_mesh_using_all_features(columnar=True)
+
+        # THEN they have the same connections, view model, renders, fingerprint and query results
+        self.assertEqual(list(m.connections), list(columnar.connections))
+        self.assertEqual([c.as_dict() for c in m.connections.values()],
+                         [c.as_dict() for c in columnar.connections.values()])
+        self.assertEqual(m.as_dict(), columnar.as_dict())
+        self.assertEqual(m.fingerprint(), columnar.fingerprint())
+        for detail in (DETAIL_FULL, DETAIL_OVERVIEW):
+            for node_ids in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+                self.assertEqual(render_mesh_as_dot(m, node_ids=node_ids, detail=detail),
+                                 render_mesh_as_dot(columnar, node_ids=node_ids, detail=detail))
+        self.assertEqual(render_mesh_as_dot(m, incremental=True), render_mesh_as_dot(columnar, incremental=True))
+        self.assertEqual(m.consumers_of('B <x>'), columnar.consumers_of('B <x>'))
+        self.assertEqual(m.dependencies_of('A'), columnar.dependencies_of('A'))
+        self.assertEqual(m.upstream_of('F'), columnar.upstream_of('F'))
+        self.assertEqual(m.shortest_path('F', 'Resource X'), columnar.shortest_path('F', 'Resource X'))
+        self.assertEqual(m.subgraph(['C']).as_dict(), columnar.subgraph(['C']).as_dict())
+        copy = pickle.loads(pickle.dumps(columnar, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(m.as_dict(), copy.as_dict())
+
+        # WHEN both are modified in the same way
+        for mesh in (m, columnar, copy):
+            mesh.add_component('G', needs_ports=['g1', 'g2'])
+            mesh.add_connection('G', 'g1', 'B <x>', 'p1')
+            mesh.highlight_connections([(('G', 'g1'), ('B <x>', 'p1'))])
+            mesh.add_connection_to_resource('G', 'g2', 'Resource X')
+            self.assertRaises(InvalidConnection, mesh.add_connection, 'G', 'g1', 'D', 'pX')
+            self.assertRaises(InvalidBatch, mesh.add_connections, [('G', 'g2', 'D', 'pX')])
+            highlights = HighlightSet(mesh).highlight_connection('C', 'nX', 'B <x>', 'p{2}')
+
+        # THEN they remain the same
+        for other in (columnar, copy):
+            self.assertEqual(m.as_dict(), other.as_dict())
+            self.assertEqual(render_mesh_as_dot(m, highlights=highlights),
+                             render_mesh_as_dot(other, highlights=highlights))
+            self.assertEqual(m.consumers_of('B <x>', 'p1'), other.consumers_of('B <x>', 'p1'))
+            self.assertEqual(m.consumers_of_resource('Resource X'), other.consumers_of_resource('Resource X'))
+
+    def test_columnar_connections_can_be_scanned_as_columns(self):
+        # GIVEN a columnar mesh
+        m = DotRenderTest._build_mesh_using_all_features(columnar=True)
+        store = m.connections
+
+        # WHEN the producer column is scanned
+        fan_in = {}
+        for producer_label, producer_port in zip(store.producer_labels, store.producer_ports):
+            if producer_port >= 0:
+                fan_in[store.names[producer_label]] = fan_in.get(store.names[producer_label], 0) + 1
+
+        # THEN it translates to the producers of the connections, which are highlighted in the highlight column
+        self.assertEqual({'B <x>': 2, 'D': 2, 'Dom__needs': 1, 'Dom__provides': 1}, fan_in)
+        self.assertEqual([c.highlighted for c in store.values()], [bool(h) for h in store.highlighted])
+        self.assertTrue(('A', 'n1') in m.connected_consumers)
+        self.assertFalse(('A', 'n3') in m.connected_consumers)
+        self.assertFalse((('A', 'n1'), ('B <x>', 'p{2}')) in store)
+
+    def test_names_are_interned_across_the_mesh(self):
+        # GIVEN names built at runtime, so that equal names are distinct string objects
+        def name(*parts):
+            return ''.join(parts)
+
+        # WHEN they are used across the mesh, one at a time, in bulk and through pickling
+        m = Mesh()
+        m.add_component(name('Ser', 'ver'), provides_ports=[name('p', '1')])
+        m.add_component('A', needs_ports=[name('p', '1')])
+        m.add_components([{'name': 'B', 'needs_ports': [name('p', '1')]}])
+        m.add_connection(name('A'), name('p', '1'), name('Ser', 'ver'), name('p', '1'))
+        m.add_connections([('B', name('p', '1'), 'Server', name('p', '1'))])
+        m.add_domain('D')
+        copy = pickle.loads(pickle.dumps(m, pickle.HIGHEST_PROTOCOL))
+
+        for mesh in (m, copy):
+            # THEN every occurrence of a name is the same string object, the consumers of a port share a single
+            # producer tuple, and domain labels are not rebuilt on each access
+            ports = [next(iter(mesh.components['Server'].provides_ports))]
+            ports.extend(next(iter(mesh.components[c].needs_ports)) for c in ('A', 'B'))
+            ports.extend(port_name for (_, port_name), _ in mesh.connections)
+            self.assertEqual(1, len(set(id(p) for p in ports)))
+            self.assertTrue(all(c.name is name_key for name_key, c in mesh.components.items()))
+            (_, first), (_, second) = mesh.connections
+            self.assertTrue(first is second)
+            self.assertTrue(first[0] is mesh.components['Server'].name)
+            self.assertTrue(mesh.components['D'].label_for_needs is mesh.components['D'].label_for_needs)
+
 
 class RenderTest(unittest.TestCase):
 
@@ -1306,6 +1988,316 @@ class RenderTest(unittest.TestCase):
         # THEN the output reflects the rendered mesh with the filtes applied
         self.assertEqual('My c0mp0nent;An0ther c0mp0nent;', out)
 
+    def test_rendered_output_can_be_streamed_in_chunks(self):
+        # GIVEN a populated mesh
+        m = Mesh()
+        for name in ('A', 'B', 'C'):
+            m.add_component(name, needs_ports=['n1'])
+
+        # WHEN the output is rendered as a stream of chunks
+        chunks = list(render_iter(m, self.JSON_TEMPLATE))
+
+        # THEN the output is split into several chunks that make up the full rendered output
+        self.assertTrue(len(chunks) > 1)
+        self.assertEqual(render(m, self.JSON_TEMPLATE), ''.join(chunks))
+
+    def test_rendered_output_can_be_written_to_a_file_object(self):
+        m = Mesh()
+        m.add_component('My component')
+
+        fp = StringIO()
+        render_to(m, '{% for c in components %}{{c.name|my_filter}};{% endfor %}', fp,
+                  custom_filters={'my_filter': lambda s: s.upper()})
+
+        self.assertEqual('MY COMPONENT;', fp.getvalue())
+
+    def test_render_stats_record_the_phases_and_filter_calls_of_a_render(self):
+        # GIVEN a mesh, and a template using a custom filter
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        m.add_component('B', provides_ports=['p1'])
+        m.add_connection('A', 'n1', 'B', 'p1')
+        template = '{% for c in components %}{{c.name|my_filter}};{% endfor %}'
+        filters = {'my_filter': lambda s: s.lower()}
+        completed = []
+
+        # WHEN it is rendered with stats
+        stats = RenderStats(on_complete=completed.append)
+        out = render(m, template, custom_filters=filters, stats=stats)
+
+        # THEN the output is unchanged, and the stats cover every phase, the mesh, the output and the filter calls
+        self.assertEqual(render(m, template, custom_filters=filters), out)
+        self.assertEqual(['compile', 'view', 'render', 'output'], list(stats.timings))
+        self.assertEqual({'nodes': 2, 'edges': 1, 'output_chars': 4, 'output_bytes': 4},
+                         dict((k, v) for k, v in stats.counters.items() if k != 'chunks'))
+        self.assertEqual({'my_filter': 2}, dict(stats.filter_calls))
+        self.assertEqual(2, stats.as_dict()['filter_calls.my_filter'])
+        self.assertEqual([stats], completed)
+
+    def test_render_stats_of_a_streamed_render_complete_once_the_output_is_consumed(self):
+        # GIVEN a streamed render with stats
+        m = Mesh()
+        m.add_component('A')
+        completed = []
+        chunks = render_iter(m, self.JSON_TEMPLATE, stats=RenderStats(on_complete=completed.append))
+
+        # WHEN the output is consumed
+        # THEN the stats are only completed at the end of the output
+        self.assertEqual([], completed)
+        self.assertEqual(render(m, self.JSON_TEMPLATE), ''.join(chunks))
+        self.assertEqual(1, len(completed))
+        self.assertEqual(len(''.join(render_iter(m, self.JSON_TEMPLATE))), completed[0].counters['output_chars'])
+
+
+class DiskRenderCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_unchanged_meshes_are_read_back_from_the_cache(self):
+        # GIVEN a cache, and a mesh
+        cache = DiskRenderCache(self.directory)
+        m = DotRenderTest._build_mesh_using_all_features()
+        expected = render_mesh_as_dot(m)
+        post_processed = []
+
+        def post_process(dot):
+            post_processed.append(dot)
+            return dot.encode('utf-8')[:10]
+
+        # WHEN it is rendered several times, including from another cache instance on the same directory
+        outputs = [cache.render_mesh_as_dot(m), cache.render_mesh_as_dot(m),
+                   DiskRenderCache(self.directory).render_mesh_as_dot(m)]
+        svg = [cache.render_mesh_as_dot(m, post_process=post_process, post_process_key='head') for _ in range(2)]
+
+        # THEN it is rendered and post-processed once, with the same result each time
+        self.assertEqual([expected] * 3, outputs)
+        self.assertEqual([expected.encode('utf-8')[:10]] * 2, svg)
+        self.assertEqual([expected], post_processed)
+        self.assertEqual((2, 2), cache.info()[:2])
+        self.assertEqual([], [name for name in os.listdir(self.directory) if not name.endswith(cache.SUFFIX)])
+
+    def test_changes_to_the_mesh_or_render_options_are_cache_misses(self):
+        # GIVEN a cache holding the render of a mesh
+        cache = DiskRenderCache(self.directory)
+        m = DotRenderTest._build_mesh_using_all_features()
+        cache.render_mesh_as_dot(m)
+
+        # WHEN the mesh is rendered with different options, or after it is changed
+        # THEN the output is rendered afresh
+        options = [
+            {'highlights': HighlightSet(m).highlight_component('C')},
+            {'node_ids': NODE_IDS_MD5},
+            {'detail': DETAIL_OVERVIEW},
+        ]
+        for kwargs in options:
+            self.assertEqual(render_mesh_as_dot(m, **kwargs), cache.render_mesh_as_dot(m, **kwargs))
+        m.highlight_component('C')
+        self.assertEqual(render_mesh_as_dot(m), cache.render_mesh_as_dot(m))
+        self.assertEqual((0, 5), cache.info()[:2])
+        self.assertRaises(ValueError, cache.render_mesh_as_dot, m, post_process=len)
+        self.assertRaises(ValueError, cache.render_mesh_as_dot, m, post_process=len, post_process_key='')
+
+    def test_least_recently_used_entries_are_evicted_to_stay_within_budget(self):
+        # GIVEN a cache with room for about two entries
+        cache = DiskRenderCache(self.directory, max_bytes=250)
+        keys = [cache.key('entry', str(i)) for i in range(3)]
+
+        # WHEN three entries are stored, after the first one was used again
+        cache.put(keys[0], 'a' * 100)
+        cache.put(keys[1], 'b' * 100)
+        os.utime(os.path.join(self.directory, keys[1] + cache.SUFFIX), (0, 0))
+        self.assertEqual('a' * 100, cache.get(keys[0]))
+        cache.put(keys[2], b'c' * 100)
+
+        # THEN the least recently used entry is evicted, and the size stays within the budget
+        self.assertEqual(['a' * 100, None, b'c' * 100], [cache.get(key) for key in keys])
+        self.assertTrue(cache.info().currsize <= 250)
+        cache.clear()
+        self.assertEqual([], os.listdir(self.directory))
+
+
+class MemoryRenderCacheTest(unittest.TestCase):
+
+    def test_identical_requests_are_served_from_memory(self):
+        # GIVEN a cache, and a mesh
+        cache = MemoryRenderCache()
+        m = DotRenderTest._build_mesh_using_all_features()
+        highlights = HighlightSet(m).highlight_component('C')
+        template = '{% for c in components %}{{c.name}}{% if c.highlighted %}*{% endif %};{% endfor %}'
+
+        # WHEN identical requests are made, then the mesh is changed
+        outputs = [cache.render_mesh_as_dot(m, highlights=highlights) for _ in range(3)]
+        renders = [cache.render(m, template, highlights=highlights) for _ in range(2)]
+        m.highlight_component('E')
+        changed = cache.render_mesh_as_dot(m, highlights=highlights)
+
+        # THEN each distinct request is rendered once
+        self.assertEqual([outputs[0]] * 3, outputs)
+        self.assertEqual(['A*;B <x>;C*;D;E;F;'] * 2, renders)
+        self.assertEqual(render_mesh_as_dot(m, highlights=highlights), changed)
+        self.assertNotEqual(outputs[0], changed)
+        info = cache.info()
+        self.assertEqual((3, 3, 3), (info.hits, info.misses, info.entries))
+
+    def test_renders_with_different_filters_of_the_same_name_are_cached_apart(self):
+        # GIVEN a cache, a mesh, and a template using a custom filter
+        cache = MemoryRenderCache()
+        m = Mesh()
+        m.add_component('a')
+        template = '{% for c in components %}{{c.name|f}}{% endfor %}'
+
+        def make(suffix):
+            return lambda s: s + suffix
+
+        # WHEN the mesh is rendered with different lambdas and closures as the filter
+        outputs = [cache.render(m, template, {'f': f})
+                   for f in (lambda s: s.upper(), lambda s: s + '!!', make('1'), make('2'))]
+
+        # THEN each filter is used
+        self.assertEqual(['A', 'a!!', 'a1', 'a2'], outputs)
+
+    def test_entries_are_evicted_to_stay_within_budget_and_expire(self):
+        # GIVEN a cache with room for about two entries, which expire after a minute
+        now = [0]
+        entry_size = sys.getsizeof('a' * 1000)
+        cache = MemoryRenderCache(max_bytes=entry_size * 5 // 2, ttl=60, clock=lambda: now[0])
+
+        # WHEN three entries are stored, after the first one was used again
+        cache.get_or_render('a', lambda: 'a' * 1000)
+        cache.get_or_render('b', lambda: 'b' * 1000)
+        cache.get_or_render('a', lambda: 'not used')
+        cache.get_or_render('c', lambda: 'c' * 1000)
+
+        # THEN the least recently used entry is evicted, and entries expire after their time to live
+        self.assertEqual('a' * 1000, cache.get_or_render('a', lambda: 'evicted'))
+        self.assertEqual('evicted', cache.get_or_render('b', lambda: 'evicted'))
+        now[0] = 61
+        self.assertEqual('expired', cache.get_or_render('c', lambda: 'expired'))
+        info = cache.info()
+        self.assertEqual((1, 3, 1), (info.evictions, info.entries, info.expirations))
+        self.assertTrue(info.currsize <= info.maxsize)
+
+    def test_concurrent_identical_requests_are_coalesced(self):
+        # GIVEN a cache, and a render which blocks until several threads are waiting for it
+        cache = MemoryRenderCache()
+        started = threading.Event()
+        release = threading.Event()
+        renders = []
+
+        def slow_render():
+            renders.append(None)
+            started.set()
+            release.wait()
+            return 'rendered'
+
+        # WHEN several threads make the same request at once
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_render('key', slow_render)))
+                   for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while cache.info().coalesced < 4:
+            release.wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        # THEN a single render serves all of them
+        self.assertEqual(['rendered'] * 5, results)
+        self.assertEqual(1, len(renders))
+        self.assertEqual((0, 1, 4), cache.info()[:3])
+
+    def test_failed_renders_are_not_cached(self):
+        # GIVEN a cache
+        cache = MemoryRenderCache()
+
+        def failing_render():
+            raise InvalidComponent('boom')
+
+        # WHEN a render fails
+        # THEN the exception is raised and the next request renders again
+        self.assertRaises(InvalidComponent, cache.get_or_render, 'key', failing_render)
+        self.assertEqual('ok', cache.get_or_render('key', lambda: 'ok'))
+
+
+class TemplateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        clear_template_cache()
+
+    def test_repeated_renders_reuse_the_compiled_template(self):
+        # GIVEN an arbitrary mesh
+        m = Mesh()
+        m.add_component('A')
+
+        # WHEN it is rendered several times with the same template
+        template = '{% for c in components %}{{c.name}};{% endfor %}'
+        outputs = [render(m, template) for _ in range(3)]
+
+        # THEN the template is only compiled once and the output is unchanged
+        self.assertEqual(['A;'] * 3, outputs)
+        info = template_cache_info()
+        self.assertEqual((2, 1, 1), (info.hits, info.misses, info.currsize))
+
+    def test_templates_compiled_with_different_filters_are_cached_separately(self):
+        m = Mesh()
+        m.add_component('foo')
+        template = '{% for c in components %}{{c.name|f}}{% endfor %}'
+
+        self.assertEqual('FOO', render(m, template, custom_filters={'f': lambda s: s.upper()}))
+        self.assertEqual('oof', render(m, template, custom_filters={'f': lambda s: s[::-1]}))
+        self.assertEqual(2, template_cache_info().misses)
+
+    def test_filters_counted_by_render_stats_are_released_with_their_template(self):
+        # GIVEN a mesh rendered with stats, using a filter which is then no longer referenced
+        m = Mesh()
+        m.add_component('foo')
+        stats = RenderStats()
+        f = lambda s: s  # noqa: E731
+        released = weakref.ref(f)
+        self.assertEqual('foo', render(m, '{{components[0].name|f}}', {'f': f}, stats=stats))
+        self.assertEqual({'f': 1}, stats.filter_calls)
+        del f
+
+        # WHEN more templates than the cache holds are rendered with stats, each with a filter of its own
+        for i in range(template_cache_info().maxsize):
+            render(m, '{0}{{{{components[0].name|f}}}}'.format(i), {'f': lambda s: s}, stats=RenderStats())
+        gc.collect()
+
+        # THEN the filter was only kept along with the template compiled with it, until it was evicted
+        self.assertEqual(None, released())
+        self.assertEqual(template_cache_info().maxsize, template_cache_info().currsize)
+
+    def test_least_recently_used_template_is_evicted_when_cache_is_full(self):
+        # GIVEN a cache that can hold two templates
+        cache = TemplateCache(maxsize=2)
+        cache.get_template('a')
+        cache.get_template('b')
+
+        # WHEN the first is used again and a third template is added
+        cache.get_template('a')
+        cache.get_template('c')
+
+        # THEN the least recently used template is the one evicted
+        cache.get_template('a')
+        cache.get_template('b')
+        self.assertEqual((2, 4, 2, 2), tuple(cache.info()))
+
+    def test_clearing_the_cache_discards_templates_and_counters(self):
+        cache = TemplateCache()
+        cache.get_template('a')
+        cache.get_template('a')
+
+        cache.clear()
+
+        self.assertEqual((0, 0, 64, 0), tuple(cache.info()))
+
 
 class DotRenderTest(unittest.TestCase):
 
@@ -1350,6 +2342,295 @@ class DotRenderTest(unittest.TestCase):
         # THEN the world does not come to an end ("WHAT??" you say? See docstring above)
         render_mesh_as_dot(m)
 
+    @staticmethod
+    def _build_mesh_using_all_features(columnar=False):
+        m = Mesh(columnar=columnar)
+        m.add_component('A', needs_ports=['n1', 'n2'])
+        m.add_component('B <x>', provides_ports=['p1', 'p{2}'], needs_ports=['nY'])
+        m.add_component('C', needs_ports=['nX'])
+        m.add_component('D', provides_ports=['pX'], needs_ports=['nX', 'nZ'])
+        m.add_component('E')
+        m.add_component('F', needs_ports=['f1'])
+        m.add_resource('Resource X')
+        m.add_resource('Resource "Y"')
+        m.add_connection('A', 'n1', 'B <x>', 'p1')
+        m.add_connection('A', 'n2', 'D', 'pX')
+        m.add_connection('C', 'nX', 'B <x>', 'p{2}')
+        m.add_connection_to_resource('D', 'nX', 'Resource X')
+        m.add_connection_to_resource('B <x>', 'nY', 'Resource "Y"')
+        m.add_domain('Dom')
+        m.add_domain('Empty')
+        m.add_component_to_domain('A', 'Dom')
+        m.add_component_to_domain('D', 'Dom')
+        m.expose_component_needs_port('D', 'nZ')
+        m.expose_component_provides_port('D', 'pX')
+        m.add_connection('F', 'f1', 'Dom', 'pX')
+        m.add_connection_to_resource('Dom', 'nZ', 'Resource X')
+        m.highlight_component('A')
+        m.highlight_connection('A', 'n1', 'B <x>', 'p1')
+        m.highlight_connection_to_resource('D', 'nX', 'Resource X')
+        m.highlight_resource('Resource X')
+        return m
+
+    def test_native_dot_output_is_identical_to_the_jinja_template_output(self):
+        for m in (Mesh(), self._build_mesh_using_all_features()):
+            expected = render(m, DOT_TEMPLATE, custom_filters=DOT_FILTERS, variables={'node_ids': m.node_ids})
+            self.assertEqual(expected, render_mesh_as_dot(m))
+
+            expected = render(m, DOT_TEMPLATE, custom_filters=DOT_FILTERS)
+            self.assertEqual(expected, render_mesh_as_dot(m, node_ids=NODE_IDS_MD5))
+
+    def test_dot_output_can_be_written_to_a_file_object(self):
+        m = self._build_mesh_using_all_features()
+
+        fp = StringIO()
+        write_mesh_as_dot(m, fp)
+
+        self.assertEqual(render_mesh_as_dot(m), fp.getvalue())
+
+    def test_dot_output_can_be_streamed_by_render_mesh_as_dot(self):
+        m = self._build_mesh_using_all_features()
+        template = '{% for c in components %}{{c.name|hash}};{% endfor %}'
+
+        for t in (DOT_TEMPLATE, template):
+            fp = StringIO()
+            self.assertEqual(None, render_mesh_as_dot(m, t, fp=fp))
+            self.assertEqual(render_mesh_as_dot(m, t), fp.getvalue())
+
+    def test_custom_templates_are_rendered_with_the_dot_filters(self):
+        m = Mesh()
+        m.add_component('A <1>')
+
+        template = '{% for c in components %}{{c.name|hash}} {{c.name|hash_p}} {{c.name|escape}}{% endfor %}'
+
+        self.assertEqual('id0 idp0 A \\<1\\>', render_mesh_as_dot(m, template=template))
+        self.assertEqual('id692578 idp692578 A \\<1\\>', render_mesh_as_dot(m, template=template, node_ids=NODE_IDS_MD5))
+
+    def test_compact_node_ids_are_unique_and_stable(self):
+        # GIVEN a mesh where many names share the same truncated MD5 hash prefix
+        m = Mesh()
+        names = ['component {0}'.format(i) for i in range(5000)]
+        m.add_components({'name': name, 'needs_ports': [name]} for name in names)
+
+        # WHEN node ids are allocated for the mesh
+        ids = set(m.node_ids.node_id(name) for name in names)
+        ids.update(m.node_ids.node_id_p(name) for name in names)
+
+        # THEN every name has its own id, which does not change when the mesh grows or is rendered again
+        self.assertEqual(10000, len(ids))
+        before = render_mesh_as_dot(m)
+        m.add_component('another component')
+        self.assertTrue(set(before.splitlines()) <= set(render_mesh_as_dot(m).splitlines()))
+
+    def test_rendering_names_missing_from_the_mesh_does_not_allocate_node_ids(self):
+        # GIVEN a mesh, and a custom template looking up the ids of names that are not in the mesh
+        m = Mesh()
+        m.add_component('A')
+        digest = m.node_ids.digest()
+        template = '{{ "A"|hash }} {{ "B"|hash }} {{ "B"|hash_p }} {{ "C"|hash }}'
+
+        # WHEN the mesh is rendered
+        out = render(m, template, custom_filters=DOT_FILTERS, variables={'node_ids': m.node_ids})
+
+        # THEN the missing names get distinct ids of their own, without modifying the symbol table of the mesh
+        self.assertEqual(4, len(set(out.split())))
+        self.assertEqual('id0', out.split()[0])
+        self.assertEqual(out, render(m, template, custom_filters=DOT_FILTERS, variables={'node_ids': m.node_ids}))
+        self.assertEqual((1, digest), (len(m.node_ids), m.node_ids.digest()))
+
+    def test_incremental_rendering_matches_full_rendering_after_every_change(self):
+        # GIVEN a mesh which has already been rendered incrementally
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1'])
+        m.add_component('B', provides_ports=['p1'])
+        m.add_resource('R')
+        m.add_domain('Dom')
+        changes = [
+            lambda: m.add_needs_port('A', 'n2'),
+            lambda: m.add_connection('A', 'n1', 'B', 'p1'),
+            lambda: m.add_provides_port('B', 'p2'),
+            lambda: m.add_connection_to_resource('A', 'n2', 'R'),
+            lambda: m.add_component('C', needs_ports=['nC']),
+            lambda: m.add_component_to_domain('B', 'Dom'),
+            lambda: m.expose_component_provides_port('B', 'p2'),
+            lambda: m.add_connection('C', 'nC', 'Dom', 'p2'),
+            lambda: m.highlight_component('A'),
+            lambda: m.highlight_connection('A', 'n1', 'B', 'p1'),
+            lambda: m.highlight_connection_to_resource('A', 'n2', 'R'),
+            lambda: m.highlight_resource('R'),
+        ]
+        for node_ids in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+            render_mesh_as_dot(m, node_ids=node_ids, incremental=True)
+
+        # WHEN the mesh is changed and rendered again incrementally after each change
+        # THEN the output is always the same as a full render of the mesh
+        for change in changes:
+            change()
+            for node_ids in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+                self.assertEqual(render_mesh_as_dot(m, node_ids=node_ids),
+                                 render_mesh_as_dot(m, node_ids=node_ids, incremental=True))
+
+    def test_highlight_sets_render_the_same_as_highlighting_the_mesh(self):
+        # GIVEN a mesh, and a copy of it with additional highlights
+        m = self._build_mesh_using_all_features()
+        highlighted = pickle.loads(pickle.dumps(m, pickle.HIGHEST_PROTOCOL))
+        highlighted.highlight_component('C')
+        highlighted.highlight_connection('C', 'nX', 'B <x>', 'p{2}')
+        highlighted.highlight_connection_to_resource('D', 'nX', 'Resource X')
+        highlighted.highlight_resource('Resource X')
+
+        # WHEN the mesh is rendered with the same highlights as a HighlightSet
+        highlights = HighlightSet(m).highlight_component('C').highlight_resource('Resource X')
+        highlights.highlight_connection('C', 'nX', 'B <x>', 'p{2}')
+        highlights.highlight_connection_to_resource('D', 'nX', 'Resource X')
+
+        # THEN the output matches the highlighted copy, both natively and through jinja2, and the mesh is unchanged
+        plain = render_mesh_as_dot(m, incremental=True)
+        jinja_template = ' ' + DOT_TEMPLATE
+        for node_ids in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+            expected = render_mesh_as_dot(highlighted, node_ids=node_ids)
+            self.assertEqual(expected, render_mesh_as_dot(m, node_ids=node_ids, highlights=highlights))
+            self.assertEqual(expected, render_mesh_as_dot(m, node_ids=node_ids, incremental=True,
+                                                          highlights=highlights))
+            self.assertEqual(' ' + expected, render_mesh_as_dot(m, jinja_template, node_ids=node_ids,
+                                                                highlights=highlights))
+        self.assertEqual(plain, render_mesh_as_dot(m, incremental=True))
+        self.assertEqual([render_mesh_as_dot(highlighted), plain],
+                         render_many([(m, DOT_TEMPLATE, highlights), m], workers=2))
+
+    def test_domains_and_connections_are_aggregated_at_lower_levels_of_detail(self):
+        # GIVEN a mesh where two components of a domain both depend on C, and on each other
+        m = Mesh()
+        m.add_component('A', needs_ports=['n1', 'n2'])
+        m.add_component('B', needs_ports=['n1'], provides_ports=['p1'])
+        m.add_component('C', provides_ports=['p1', 'p2'])
+        m.add_component('D', needs_ports=['n1'])
+        m.add_resource('R')
+        m.add_domain('Dom')
+        m.add_component_to_domain('A', 'Dom')
+        m.add_component_to_domain('B', 'Dom')
+        m.add_connection('A', 'n1', 'C', 'p1')
+        m.add_connection('A', 'n2', 'B', 'p1')
+        m.add_connection('B', 'n1', 'C', 'p2')
+        m.add_connection_to_resource('D', 'n1', 'R')
+        m.highlight_connection('B', 'n1', 'C', 'p2')
+
+        # WHEN it is rendered as an overview
+        overview = render_mesh_as_dot(m, detail=DETAIL_OVERVIEW)
+        lines = [line.strip() for line in overview.splitlines() if line.strip()]
+
+        # THEN the domain is a single node, and there is one edge per pair of nodes labelled with its connection count
+        ids = dict((name, m.node_ids.node_id(name)) for name in ('C', 'D', 'Dom'))
+        self.assertEqual([
+            '{0} [shape="box";label="C"];'.format(ids['C']),
+            '{0} [shape="box";label="D"];'.format(ids['D']),
+            '{0} [shape="box";style="rounded,bold";label="Dom\\n(2 components)"];'.format(ids['Dom']),
+            '{0} [shape="rect";label="R", style="dashed"];'.format(m.node_ids.node_id_p('R')),
+            '{0} -> {1} [label="2", color="red"];'.format(ids['Dom'], ids['C']),
+            '{0} -> {1} [style="dashed", label="1"];'.format(ids['D'], m.node_ids.node_id_p('R')),
+        ], lines[3:-1])
+
+        # AND components keep their ports at the components level of detail, which only supports the default template
+        port = 'PORT="{0}"'.format(m.node_ids.node_id_p('p2'))
+        self.assertTrue(port in render_mesh_as_dot(m, detail=DETAIL_COMPONENTS))
+        self.assertRaises(ValueError, render_mesh_as_dot, m, '{{ components }}', detail=DETAIL_OVERVIEW)
+        self.assertRaises(ValueError, render_mesh_as_dot, m, detail='everything')
+
+    def test_output_is_byte_identical_across_hash_seeds(self):
+        # GIVEN a script rendering a mesh with many domain children and highlighted resources
+        script = '\n'.join([
+            'import sys',
+            'from hexaviz import Mesh, NODE_IDS_MD5, render_mesh_as_dot',
+            'from tests import DotRenderTest',
+            'm = DotRenderTest._build_mesh_using_all_features()',
+            'for i in range(50):',
+            '    m.add_component("child {0}".format(i))',
+            '    m.add_component_to_domain("child {0}".format(i), "Empty")',
+            '    m.add_resource("resource {0}".format(i))',
+            '    m.highlight_resource("resource {0}".format(i))',
+            'sys.stdout.write(render_mesh_as_dot(m) + render_mesh_as_dot(m, node_ids=NODE_IDS_MD5))',
+        ])
+        here = os.path.dirname(os.path.abspath(__file__))
+
+        # WHEN it is run with different hash seeds
+        outputs = set()
+        for seed in ('0', '1', '2', '12345'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, cwd=here, env=env)
+            outputs.add(process.communicate()[0])
+            self.assertEqual(0, process.returncode)
+
+        # THEN the output is always the same
+        self.assertEqual(1, len(outputs))
+
+    def test_render_many_returns_the_results_in_job_order(self):
+        # GIVEN a mix of jobs using the default and custom templates
+        template = '{% for c in components %}{{c.name|hash}}:{{c.name|escape}};{% endfor %}'
+        meshes = []
+        for i in range(6):
+            m = self._build_mesh_using_all_features()
+            m.add_component('extra {0}'.format(i))
+            meshes.append(m)
+        jobs = [meshes[0], (meshes[1], template), (meshes[2], DOT_TEMPLATE), meshes[3], (meshes[4], template),
+                meshes[5]]
+        expected = [render_mesh_as_dot(m) if isinstance(j, Mesh) or j[1] == DOT_TEMPLATE
+                    else render_mesh_as_dot(m, template) for m, j in zip(meshes, jobs)]
+
+        # WHEN they are rendered in parallel, or in process
+        # THEN the results are the same as rendering each job individually, in job order
+        self.assertEqual(expected, render_many(jobs, workers=2))
+        self.assertEqual(expected, render_many(jobs, workers=1))
+        self.assertEqual([], render_many([], workers=2))
+
+    def test_custom_templates_hash_each_distinct_name_once_per_render(self):
+        # GIVEN a mesh where the same consumer components are referenced by many connections
+        m = Mesh()
+        ports = ['p{0}'.format(i) for i in range(5)]
+        m.add_component('server', provides_ports=ports)
+        for client in ('client <1>', 'client <2>'):
+            m.add_component(client, needs_ports=ports)
+            m.add_connections((client, port, 'server', port) for port in ports)
+        template = ('{% for c in connections %}{{ c.consumer_component|hash }}:{{ c.consumer_component|escape }};'
+                    '{% endfor %}')
+
+        for node_ids in (NODE_IDS_COMPACT, NODE_IDS_MD5):
+            # WHEN it is rendered with a custom template that also reports the size of the symbol table
+            out = render_mesh_as_dot(m, template + '{{ dot_symbols.hash|length }}', node_ids=node_ids)
+
+            # THEN the output is the same as computing every ID and label on each call, but only the two distinct
+            # names were hashed
+            variables = {'node_ids': m.node_ids} if node_ids == NODE_IDS_COMPACT else None
+            self.assertEqual(render(m, template, custom_filters=DOT_FILTERS, variables=variables) + '2', out)
+
+    def test_render_stats_of_native_renders_count_symbol_lookups_as_filter_calls(self):
+        # GIVEN a mesh using all features
+        m = self._build_mesh_using_all_features()
+
+        for render_options in ({}, {'template': ' ' + DOT_TEMPLATE}, {'detail': DETAIL_OVERVIEW}):
+            # WHEN it is rendered natively or through jinja2, and to a file, with stats
+            stats, written_stats = RenderStats(), RenderStats()
+            out = render_mesh_as_dot(m, stats=stats, **render_options)
+            fp = StringIO()
+            write_mesh_as_dot(m, fp, stats=written_stats, **render_options)
+
+            # THEN the output is unchanged and the lookups of IDs and labels are counted as calls of the DOT filters
+            self.assertEqual(render_mesh_as_dot(m, **render_options), out)
+            self.assertEqual(out, fp.getvalue())
+            self.assertEqual(len(out), stats.counters['output_chars'])
+            self.assertEqual(set(['hash', 'hash_p', 'escape']), set(stats.filter_calls))
+            self.assertTrue(stats.filter_calls['hash'] > 0)
+            self.assertEqual(stats.counters, written_stats.counters)
+            self.assertEqual(stats.filter_calls, written_stats.filter_calls)
+            self.assertTrue(set(['render', 'output']) <= set(stats.timings))
+
+        # WHEN it is rendered incrementally a second time
+        render_mesh_as_dot(m, incremental=True)
+        stats = RenderStats()
+        render_mesh_as_dot(m, incremental=True, stats=stats)
+
+        # THEN no IDs or labels are looked up, as every fragment is reused
+        self.assertEqual({'hash': 0, 'hash_p': 0, 'escape': 0}, dict(stats.filter_calls))
+
 
 if __name__ == '__main__':
     unittest.main()